@@ -1,7 +1,5 @@
-import bcrypt
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from .database import User, get_db
@@ -10,13 +8,18 @@ from .database import User, get_db
 SECRET_KEY = "your-secret-key-change-this-in-production-12345"  # ZMIEŃ W PRODUKCJI!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 godziny
+# Zakres krótkich tokenów do strumienia zdarzeń (EventSource nie wysyła nagłówków)
+EVENTS_TOKEN_SCOPE = "events"
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
+# Dla endpointów dostępnych także bez logowania
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Weryfikuje hasło używając bcrypt bezpośrednio"""
+    import bcrypt
     return bcrypt.checkpw(
         plain_password.encode('utf-8'), 
         hashed_password.encode('utf-8')
@@ -25,6 +28,8 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hashuje hasło używając bcrypt bezpośrednio"""
+    import bcrypt
+    
     # Obcina hasło do 72 bajtów (limit bcrypt)
     password_bytes = password.encode('utf-8')[:72]
     salt = bcrypt.gensalt()
@@ -34,6 +39,8 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Tworzy JWT token"""
+    from jose import jwt
+    
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -45,11 +52,10 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
-) -> User:
-    """Pobiera aktualnie zalogowanego użytkownika z tokenu"""
+def _user_from_token(token: str, db: Session, scope: str = None) -> User:
+    """Użytkownik z tokenu o danym zakresie (None - zwykły token logowania)"""
+    from jose import JWTError, jwt
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,7 +65,7 @@ async def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
@@ -71,6 +77,54 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), 
+    db: Session = Depends(get_db)
+) -> User:
+    """Pobiera aktualnie zalogowanego użytkownika z tokenu"""
+    return _user_from_token(token, db)
+
+
+def create_events_token(user: User) -> str:
+    """Krótki token tylko do strumienia zdarzeń - bezpieczniejszy w URL niż token logowania"""
+    from . import config
+    
+    return create_access_token(
+        {"sub": user.username, "scope": EVENTS_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=config.EVENTS_TOKEN_TTL_SECONDS)
+    )
+
+
+async def get_events_user(
+    token: str = Query(None, description="Token z POST /api/admin/events/token (dla EventSource)"),
+    header_token: str = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """Użytkownik strumienia zdarzeń: token zdarzeń w ?token= albo zwykły nagłówek Authorization"""
+    if token:
+        return _user_from_token(token, db, scope=EVENTS_TOKEN_SCOPE)
+    if header_token:
+        return _user_from_token(header_token, db)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_optional_username(token: str = Depends(optional_oauth2_scheme)):
+    """Nazwa użytkownika z poprawnego tokenu albo None (brak lub nieważny token)"""
+    from jose import JWTError, jwt
+    
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return None if payload.get("scope") else payload.get("sub")
+
+
 def authenticate_user(db: Session, username: str, password: str):
     """Autentykuje użytkownika"""
     user = db.query(User).filter(User.username == username).first()
@@ -0,0 +1,142 @@
+"""Konfiguracja aplikacji - wartości domyślne nadpisywane zmiennymi środowiskowymi."""
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def _env_int(name: str, default: int) -> int:
+    """Odczytuje liczbę całkowitą ze zmiennej środowiskowej"""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Odczytuje liczbę zmiennoprzecinkową ze zmiennej środowiskowej"""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# ===== BAZA DANYCH =====
+# Baza główna (zapisy) i opcjonalna replika do ciężkich odczytów admina (puste - baza główna)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./signatures.db")
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+# Pula połączeń (na silnik)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 30.0)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+# Lokalna replika SQLite: co ile sekund kopiować bazę główną do READ_DATABASE_URL (0 - wyłączone)
+READ_REPLICA_SYNC_SECONDS = _env_float("READ_REPLICA_SYNC_SECONDS", 0.0)
+
+# ===== PLIKI =====
+# Folder na podpisane PDF-y
+SIGNED_PDF_DIR = Path(os.getenv("SIGNED_PDF_DIR", "signed_pdfs"))
+# Folder na pliki przygotowane do podpisu (prepare -> embed)
+STAGING_DIR = Path(os.getenv(
+    "STAGING_DIR", os.path.join(tempfile.gettempdir(), "pdf_signature_staging")
+))
+
+# ===== ADMISSION CONTROL =====
+# Limity dla endpointów obciążających CPU (parsowanie PDF, hash, RSA)
+ADMISSION_LIMITS = {
+    "prepare": {
+        "max_concurrency": _env_int("ADMISSION_PREPARE_CONCURRENCY", 4),
+        "max_queue": _env_int("ADMISSION_PREPARE_QUEUE", 32),
+    },
+    "embed": {
+        "max_concurrency": _env_int("ADMISSION_EMBED_CONCURRENCY", 4),
+        "max_queue": _env_int("ADMISSION_EMBED_QUEUE", 32),
+    },
+    "verify": {
+        "max_concurrency": _env_int("ADMISSION_VERIFY_CONCURRENCY", 8),
+        "max_queue": _env_int("ADMISSION_VERIFY_QUEUE", 64),
+    },
+}
+
+# Maksymalna liczba żądań jednego użytkownika (aktywne + w kolejce) na klasę endpointów
+ADMISSION_MAX_PER_USER = _env_int("ADMISSION_MAX_PER_USER", 4)
+
+# Adresy zaufanych reverse proxy (po przecinku). Tylko od nich brany jest X-Forwarded-For
+# przy rozróżnianiu anonimowych klientów weryfikacji; puste - adres połączenia.
+# Alternatywa: uvicorn --proxy-headers --forwarded-allow-ips=<proxy> (wtedy zostaw puste)
+TRUSTED_PROXY_IPS = {ip.strip() for ip in os.getenv("TRUSTED_PROXY_IPS", "").split(",") if ip.strip()}
+
+# Maksymalny czas oczekiwania w kolejce (sekundy)
+ADMISSION_QUEUE_TIMEOUT = _env_float("ADMISSION_QUEUE_TIMEOUT", 30.0)
+
+# Początkowe oszacowanie czasu obsługi żądania (sekundy), zanim zbierzemy pomiary
+ADMISSION_INITIAL_SERVICE_TIME = _env_float("ADMISSION_INITIAL_SERVICE_TIME", 0.5)
+
+# ===== CACHE =====
+# Maksymalna liczba załadowanych kluczy publicznych RSA w pamięci
+PUBLIC_KEY_CACHE_SIZE = _env_int("PUBLIC_KEY_CACHE_SIZE", 1024)
+
+# Cache wyników weryfikacji podpisów (liczba wpisów i czas życia w sekundach)
+VERIFICATION_CACHE_SIZE = _env_int("VERIFICATION_CACHE_SIZE", 4096)
+VERIFICATION_CACHE_TTL = _env_float("VERIFICATION_CACHE_TTL", 3600.0)
+
+# Cache zserializowanych odpowiedzi list (liczba wpisów i suma rozmiaru; trzymane są
+# tylko strony aktualnej wersji rejestru)
+LISTING_CACHE_SIZE = _env_int("LISTING_CACHE_SIZE", 256)
+LISTING_CACHE_MAX_BYTES = _env_int("LISTING_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# ===== START =====
+# Czy importować ciężkie biblioteki (PDF, kryptografia) w tle zaraz po starcie
+PREWARM_ON_STARTUP = os.getenv("PREWARM_ON_STARTUP", "1") != "0"
+
+# ===== EKSPORT =====
+# Liczba wierszy pobieranych z kursora naraz i wielkość wysyłanych kawałków
+EXPORT_BATCH_SIZE = _env_int("EXPORT_BATCH_SIZE", 1000)
+EXPORT_CHUNK_BYTES = _env_int("EXPORT_CHUNK_BYTES", 64 * 1024)
+
+# ===== ZDARZENIA (SSE) =====
+# Bufor zdarzeń na klienta (po przepełnieniu klient jest odłączany) i odstęp keepalive
+EVENT_BUFFER_SIZE = _env_int("EVENT_BUFFER_SIZE", 100)
+EVENT_KEEPALIVE_SECONDS = _env_float("EVENT_KEEPALIVE_SECONDS", 15.0)
+# Ważność tokenu do podłączenia EventSource (?token=) - wystarczy na nawiązanie połączenia
+EVENTS_TOKEN_TTL_SECONDS = _env_int("EVENTS_TOKEN_TTL_SECONDS", 60)
+
+# ===== USUWANIE PLIKÓW =====
+# Liczba prób usunięcia pliku przez reaper i bazowe opóźnienie między próbami (rośnie x2)
+REAPER_MAX_ATTEMPTS = _env_int("REAPER_MAX_ATTEMPTS", 5)
+REAPER_RETRY_DELAY = _env_float("REAPER_RETRY_DELAY", 1.0)
+# Maksymalna liczba podpisów usuwanych jednym żądaniem bulk delete
+BULK_DELETE_MAX = _env_int("BULK_DELETE_MAX", 10000)
+
+# ===== SPRZĄTANIE DYSKU =====
+# Co ile sekund uruchamiać sprzątanie w tle (0 - wyłączone)
+GC_INTERVAL_SECONDS = _env_float("GC_INTERVAL_SECONDS", 900.0)
+# Porzucone pliki z prepare starsze niż limit są usuwane; ponad budżet - najstarsze
+GC_STAGING_MAX_AGE = _env_float("GC_STAGING_MAX_AGE", 3600.0)
+GC_STAGING_MAX_BYTES = _env_int("GC_STAGING_MAX_BYTES", 512 * 1024 * 1024)
+# Pliki młodsze niż ten czas nigdy nie są usuwane (trwające prepare / embed)
+GC_GRACE_SECONDS = _env_float("GC_GRACE_SECONDS", 300.0)
+# Pliki w signed_pdfs bez rekordu w bazie nie są usuwane, tylko przenoszone do kwarantanny
+# (podpisanych PDF-ów nie da się odtworzyć). Cykliczne sprzątanie tylko je raportuje,
+# chyba że GC_SCHEDULED_ORPHANS=1; na żądanie admina (POST /api/admin/gc) są przenoszone.
+GC_QUARANTINE_DIR = Path(os.getenv("GC_QUARANTINE_DIR", "signed_pdfs_quarantine"))
+GC_SCHEDULED_ORPHANS = os.getenv("GC_SCHEDULED_ORPHANS", "0") == "1"
+# Bezpiecznik: gdy baza nie zna żadnego pliku albo "osierocona" byłaby większa część plików
+# niż ten ułamek, nic nie jest przenoszone (zła baza / inny katalog roboczy) - chyba że force
+GC_ORPHAN_MAX_FRACTION = _env_float("GC_ORPHAN_MAX_FRACTION", 0.1)
+
+# ===== ARCHIWUM =====
+# Folder na paczki archiwum (skompresowane stare podpisane PDF-y)
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", "archive"))
+# Po ilu dniach podpisany PDF trafia do archiwum i jak duża może być jedna paczka
+ARCHIVE_AFTER_DAYS = _env_int("ARCHIVE_AFTER_DAYS", 90)
+ARCHIVE_PACK_MAX_BYTES = _env_int("ARCHIVE_PACK_MAX_BYTES", 256 * 1024 * 1024)
+# Liczba dokumentów archiwizowanych w jednej transakcji i poziom kompresji (1-9)
+ARCHIVE_BATCH_SIZE = _env_int("ARCHIVE_BATCH_SIZE", 200)
+ARCHIVE_COMPRESSION_LEVEL = _env_int("ARCHIVE_COMPRESSION_LEVEL", 6)
+# Co ile sekund uruchamiać archiwizację w tle (0 - wyłączone)
+ARCHIVE_INTERVAL_SECONDS = _env_float("ARCHIVE_INTERVAL_SECONDS", 86400.0)
+# Paczka jest przepisywana (kompaktowana), gdy martwe bajty usuniętych dokumentów
+# stanowią co najmniej taki ułamek jej rozmiaru
+ARCHIVE_COMPACT_MIN_DEAD_FRACTION = _env_float("ARCHIVE_COMPACT_MIN_DEAD_FRACTION", 0.3)
+
+# ===== OPTYMALIZACJA PDF =====
+# Czy domyślnie zmniejszać PDF przy prepare (scalanie obiektów, kompresja treści, usuwanie
+# nieużywanych zasobów); klient może to nadpisać polem optimize w formularzu
+PDF_OPTIMIZE = os.getenv("PDF_OPTIMIZE", "0") == "1"
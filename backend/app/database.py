@@ -1,19 +1,93 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Boolean, ForeignKey, LargeBinary, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from datetime import datetime
+import base64
+import json
 import uuid
 
-DATABASE_URL = "sqlite:///./signatures.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from .services.crypto_service import jwk_thumbprint
+from . import config
+
+
+def _create_engine(url: str):
+    """Silnik z ustawieniami puli z konfiguracji"""
+    options = {}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # Baza w pamięci ma jedną pulę na wątek - bez ustawień rozmiaru
+            return create_engine(url, **options)
+    else:
+        options["pool_pre_ping"] = True
+    return create_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        **options
+    )
+
+
+DATABASE_URL = config.DATABASE_URL
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Silnik do ciężkich odczytów (listy, eksport, statystyki); bez repliki - ten sam co zapisy
+READ_DATABASE_URL = config.READ_DATABASE_URL or DATABASE_URL
+read_engine = _create_engine(READ_DATABASE_URL) if config.READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
+class UUIDBytes(TypeDecorator):
+    """UUID zapisany jako 16 bajtów (BLOB), w Pythonie widoczny jako string"""
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        try:
+            return uuid.UUID(str(value)).bytes
+        except ValueError:
+            # Nie-UUID (np. zły parametr w URL) - zapisz/porównuj jako tekst
+            return str(value).encode('utf-8')
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if len(value) == 16:
+            return str(uuid.UUID(bytes=bytes(value)))
+        return bytes(value).decode('utf-8')
+
+
+class Base64Bytes(TypeDecorator):
+    """Surowe bajty (BLOB), w Pythonie widoczne jako string Base64"""
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return base64.b64decode(value, validate=True)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return base64.b64encode(value).decode('utf-8')
+
+
 class User(Base):
     """Model użytkownika"""
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDBytes, primary_key=True, default=lambda: str(uuid.uuid4()))
     username = Column(String, unique=True, nullable=False, index=True)
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
@@ -24,23 +98,43 @@ class User(Base):
     signatures = relationship("Signature", back_populates="signer")
 
 
+class PublicKey(Base):
+    """Model klucza publicznego (jeden wiersz na klucz, identyfikowany thumbprintem JWK)"""
+    __tablename__ = "public_keys"
+    
+    # Thumbprint RFC 7638 (base64url SHA-256)
+    thumbprint = Column(String, primary_key=True)
+    jwk = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relacja z podpisami
+    signatures = relationship("Signature", back_populates="public_key")
+
+
 class Signature(Base):
     """Model podpisu cyfrowego"""
     __tablename__ = "signatures"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDBytes, primary_key=True, default=lambda: str(uuid.uuid4()))
     
     # Powiązanie z użytkownikiem
-    user_id = Column(String, ForeignKey('users.id'), nullable=False)
+    user_id = Column(UUIDBytes, ForeignKey('users.id'), nullable=False)
     
-    # Dane kryptograficzne
-    file_hash = Column(String, nullable=False)
-    signature_data = Column(Text, nullable=False)
-    public_key_jwk = Column(Text, nullable=False)
+    # Dane kryptograficzne (surowe bajty, w API jako Base64)
+    file_hash = Column(Base64Bytes, nullable=False)
+    signature_data = Column(Base64Bytes, nullable=False)
+    public_key_thumbprint = Column(String, ForeignKey('public_keys.thumbprint'), nullable=False, index=True)
     
     # Ścieżka do podpisanego PDF
     signed_pdf_path = Column(String, nullable=True)
     original_filename = Column(String, nullable=True)
+    file_size = Column(Integer, nullable=True)  # rozmiar podpisanego PDF w bajtach
+    
+    # Warstwa przechowywania: "hot" - plik w signed_pdfs, "archive" - skompresowany w paczce
+    storage_tier = Column(String, nullable=False, default="hot")
+    archive_pack = Column(String, nullable=True)
+    archive_offset = Column(Integer, nullable=True)
+    archive_length = Column(Integer, nullable=True)  # długość skompresowanych danych w paczce
     
     # Metadane podpisu
     signer_name = Column(String, nullable=True)
@@ -49,15 +143,72 @@ class Signature(Base):
     signer_contact = Column(String, nullable=True)
     
     # Timestamp
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    # Wybór kandydatów do archiwizacji: najstarsze pliki w warstwie "hot"
+    __table_args__ = (
+        Index("ix_signatures_storage_tier_created_at", "storage_tier", "created_at"),
+    )
     
     # Relacja z użytkownikiem
     signer = relationship("User", back_populates="signatures")
+    
+    # Relacja z kluczem publicznym
+    public_key = relationship("PublicKey", back_populates="signatures")
+    
+    @property
+    def public_key_jwk(self):
+        """Klucz publiczny w formacie JWK (JSON) - jak w poprzednim schemacie"""
+        return self.public_key.jwk if self.public_key else None
+
+
+class SignatureStat(Base):
+    """
+    Liczniki podpisów utrzymywane przyrostowo (w tej samej transakcji co insert/delete).
+    dimension: "total" | "user" | "day" | "reason", key: wartość w danym wymiarze
+    """
+    __tablename__ = "signature_stats"
+    
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    signature_count = Column(Integer, nullable=False, default=0)
+    storage_bytes = Column(Integer, nullable=False, default=0)
+
+
+class RegistryVersion(Base):
+    """
+    Wersja rejestru podpisów - zwiększana w tej samej transakcji co każde
+    dodanie / usunięcie podpisu (ETag list). epoch odróżnia bazy utworzone od nowa.
+    """
+    __tablename__ = "registry_version"
+    
+    name = Column(String, primary_key=True)
+    epoch = Column(String, nullable=False, default=lambda: uuid.uuid4().hex[:8])
+    version = Column(Integer, nullable=False, default=0)
+
+
+def get_or_create_public_key(db, public_key_jwk: str) -> PublicKey:
+    """Zwraca wiersz klucza publicznego dla JWK, tworząc go przy pierwszym użyciu"""
+    thumbprint = jwk_thumbprint(json.loads(public_key_jwk))
+    public_key = db.get(PublicKey, thumbprint)
+    if public_key is not None:
+        return public_key
+    
+    # Równoległy embed z tym samym nowym kluczem mógł go właśnie dodać -
+    # wtedy cofamy tylko savepoint i bierzemy istniejący wiersz
+    try:
+        with db.begin_nested():
+            public_key = PublicKey(thumbprint=thumbprint, jwk=public_key_jwk)
+            db.add(public_key)
+    except IntegrityError:
+        public_key = db.get(PublicKey, thumbprint, populate_existing=True)
+    return public_key
 
 
 def init_db():
-    """Inicjalizuje bazę danych"""
-    Base.metadata.create_all(bind=engine)
+    """Inicjalizuje bazę danych (tworzy brakujące tabele i migruje istniejące)"""
+    from .migrations import upgrade
+    upgrade(engine)
 
 
 def get_db():
@@ -67,3 +218,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Dependency dla FastAPI - sesja tylko do odczytu (replika, jeśli skonfigurowana)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
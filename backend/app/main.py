@@ -1,12 +1,85 @@
+import time
+
+# Pomiar czasu importu aplikacji (zimny start)
+_IMPORT_STARTED = time.perf_counter()
+
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from .routes import signature_routes, admin_routes, auth_routes
 from .database import init_db
+from .services import disk_gc, archive_service, replica_service
+from . import config
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# Ciężkie biblioteki ładowane w tle po starcie (PDF, kryptografia, hasła)
+PREWARM_MODULES = [
+    "PyPDF2",
+    "cryptography.hazmat.primitives.asymmetric.rsa",
+    "cryptography.hazmat.primitives.asymmetric.padding",
+    "bcrypt",
+    "jose.jwt",
+]
+
+startup_metrics = {
+    "import_seconds": round(IMPORT_SECONDS, 4),
+    "init_seconds": None,
+    "prewarm_seconds": None,
+    "startup_seconds": None,
+}
+readiness = {"database": False, "prewarm": False}
+
+
+def _prewarm():
+    """Importuje ciężkie moduły w tle, żeby pierwsze żądanie nie płaciło za import"""
+    started = time.perf_counter()
+    for module in PREWARM_MODULES:
+        try:
+            __import__(module)
+        except Exception as e:
+            print(f"⚠️ Prewarm {module} nieudany: {e}")
+    startup_metrics["prewarm_seconds"] = round(time.perf_counter() - started, 4)
+    readiness["prewarm"] = True
+    print(f"🔥 Prewarm zakończony w {startup_metrics['prewarm_seconds']}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicjalizacja przy starcie: baza, foldery, prewarm w tle"""
+    started = time.perf_counter()
+
+    init_db()
+    replica_service.start()
+    config.SIGNED_PDF_DIR.mkdir(exist_ok=True)
+    config.STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    readiness["database"] = True
+
+    startup_metrics["init_seconds"] = round(time.perf_counter() - started, 4)
+    startup_metrics["startup_seconds"] = round(IMPORT_SECONDS + startup_metrics["init_seconds"], 4)
+    print(f"🚀 Start: import {startup_metrics['import_seconds']}s, init {startup_metrics['init_seconds']}s")
+
+    if config.PREWARM_ON_STARTUP:
+        threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+    else:
+        readiness["prewarm"] = True
+
+    disk_gc.start()
+    archive_service.start()
+    yield
+    disk_gc.stop()
+    archive_service.stop()
+    replica_service.stop()
+
 
 app = FastAPI(
     title="PDF Signature System API",
     description="System podpisów cyfrowych dla PDF z autentykacją",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # ===== POPRAWIONE CORS =====
@@ -26,9 +99,6 @@ app.add_middleware(
     max_age=3600,
 )
 
-# Inicjalizuj bazę
-init_db()
-
 # Routes
 app.include_router(auth_routes.router, prefix="/api")
 app.include_router(signature_routes.router, prefix="/api")
@@ -46,7 +116,17 @@ async def root():
 async def health():
     return {
         "status": "healthy", 
-        "database": "connected", 
+        "database": "connected" if readiness["database"] else "initializing",
         "auth": "enabled",
-        "cors": "configured"
+        "cors": "configured",
+        "startup": startup_metrics
     }
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe - 503 dopóki baza i prewarm nie są gotowe"""
+    is_ready = all(readiness.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "checks": readiness, "startup": startup_metrics}
+    )
@@ -0,0 +1,221 @@
+"""
+Migracje istniejących baz SQLite do aktualnego schematu modeli.
+
+Tabele, których kolumny różnią się od modelu, są przebudowywane wg
+procedury zalecanej przez SQLite: nowa tabela -> kopia wierszy ->
+usunięcie starej -> zmiana nazwy. Wiersze przechodzą przez funkcje
+transformujące zarejestrowane dla danej tabeli.
+
+Uruchomienie ręczne:  python -m app.migrations [ścieżka/do/bazy.db]
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import sys
+from itertools import groupby
+
+from sqlalchemy import MetaData, Table, Column, create_engine, inspect, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.types import NullType
+
+from .database import Base, User, PublicKey, Signature, SignatureStat, engine
+from .services.crypto_service import jwk_thumbprint
+from .services import stats_service, search_service, registry_service
+
+# Rozmiar paczki wierszy kopiowanych podczas przebudowy tabeli
+BATCH_SIZE = 1000
+
+# Użytkownik, do którego trafiają podpisy ze starych baz bez kolumny user_id
+LEGACY_USERNAME = "legacy"
+
+
+def _column_type_sql(conn, column) -> str:
+    return column.type.compile(dialect=conn.dialect).upper()
+
+
+def _table_info(conn, table_name: str) -> dict:
+    """Kolumny tabeli w bazie: nazwa -> zadeklarowany typ"""
+    rows = conn.exec_driver_sql(f'PRAGMA table_info("{table_name}")').fetchall()
+    return {row[1]: (row[2] or "").upper() for row in rows}
+
+
+def _needs_rebuild(conn, table: Table) -> bool:
+    existing = _table_info(conn, table.name)
+    expected = {column.name: _column_type_sql(conn, column) for column in table.columns}
+    return existing != expected
+
+
+def _source_table(conn, table: Table, name: str) -> Table:
+    """
+    Opis starej tabeli do odczytu. Kolumny o niezmienionym typie czytamy
+    typem z modelu (np. DateTime -> datetime), pozostałe jako surowe wartości.
+    """
+    columns = []
+    for column_name, column_type in _table_info(conn, name).items():
+        model_column = table.columns.get(column_name)
+        if model_column is not None and _column_type_sql(conn, model_column) == column_type:
+            columns.append(Column(column_name, model_column.type))
+        else:
+            columns.append(Column(column_name, NullType()))
+    return Table(name, MetaData(), *columns)
+
+
+def _legacy_user_id(conn) -> str:
+    """Zwraca id użytkownika-zaślepki dla podpisów bez właściciela"""
+    users = User.__table__
+    row = conn.execute(users.select().where(users.c.username == LEGACY_USERNAME)).first()
+    if row is not None:
+        return row.id
+
+    from .auth import get_password_hash
+    result = conn.execute(users.insert().values(
+        username=LEGACY_USERNAME,
+        email=f"{LEGACY_USERNAME}@localhost",
+        # Losowe hasło - konto służy wyłącznie jako właściciel starych rekordów
+        hashed_password=get_password_hash(secrets.token_urlsafe(32)),
+        role="user"
+    ))
+    return result.inserted_primary_key[0]
+
+
+def _attach_public_key(conn, row: dict) -> dict:
+    """Przenosi public_key_jwk do tabeli public_keys i zostawia tylko thumbprint"""
+    jwk_text = row.pop("public_key_jwk", None)
+    if jwk_text is None or row.get("public_key_thumbprint"):
+        return row
+
+    try:
+        thumbprint = jwk_thumbprint(json.loads(jwk_text))
+    except (ValueError, KeyError, TypeError):
+        # Uszkodzony JWK - zachowujemy go pod sztucznym identyfikatorem
+        thumbprint = "legacy-" + hashlib.sha256(jwk_text.encode("utf-8")).hexdigest()
+
+    public_keys = PublicKey.__table__
+    exists = conn.execute(
+        public_keys.select().where(public_keys.c.thumbprint == thumbprint)
+    ).first()
+    if exists is None:
+        conn.execute(public_keys.insert().values(thumbprint=thumbprint, jwk=jwk_text))
+
+    row["public_key_thumbprint"] = thumbprint
+    return row
+
+
+def _attach_owner(conn, row: dict) -> dict:
+    """Podpisy ze starych baz (bez user_id) przypisuje do użytkownika legacy"""
+    if not row.get("user_id"):
+        row["user_id"] = _legacy_user_id(conn)
+    return row
+
+
+def _attach_file_size(conn, row: dict) -> dict:
+    """Uzupełnia rozmiar podpisanego PDF na podstawie pliku na dysku"""
+    if row.get("file_size") is None:
+        path = row.get("signed_pdf_path")
+        row["file_size"] = os.path.getsize(path) if path and os.path.exists(path) else None
+    return row
+
+
+# Transformacje wierszy wykonywane podczas przebudowy tabel (w tej kolejności)
+ROW_TRANSFORMS = {
+    User.__tablename__: [],
+    Signature.__tablename__: [_attach_public_key, _attach_owner, _attach_file_size],
+}
+
+
+def _rebuild_table(conn, table: Table):
+    """Przebudowuje tabelę do schematu z modelu, kopiując wiersze"""
+    new_name = f"{table.name}__new"
+    print(f"🔧 Migracja tabeli {table.name}")
+
+    # Nowa tabela pod tymczasową nazwą (indeksy tworzymy po zmianie nazwy);
+    # pozostałe tabele kopiujemy tylko po to, żeby rozwiązać klucze obce
+    metadata = MetaData()
+    for other in Base.metadata.sorted_tables:
+        if other is not table:
+            other.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=new_name)
+    new_table.indexes.clear()
+    conn.execute(CreateTable(new_table))
+
+    source = _source_table(conn, table, table.name)
+    transforms = ROW_TRANSFORMS.get(table.name, [])
+    copied = 0
+
+    result = conn.execute(source.select().order_by(text("rowid")))
+    while True:
+        rows = result.mappings().fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        batch = []
+        for row in rows:
+            values = dict(row)
+            for transform in transforms:
+                values = transform(conn, values)
+            batch.append({key: value for key, value in values.items() if key in new_table.c})
+        # executemany wymaga tych samych kluczy w każdym wierszu
+        for _, group in groupby(batch, key=lambda values: tuple(values)):
+            conn.execute(new_table.insert(), list(group))
+        copied += len(batch)
+
+    # Stare indeksy znikają razem z tabelą
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"')
+    for index in table.indexes:
+        index.create(conn)
+
+    print(f"✅ Tabela {table.name}: skopiowano {copied} wierszy")
+
+
+def upgrade(engine):
+    """Tworzy brakujące tabele i przebudowuje tabele o nieaktualnym schemacie"""
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # pysqlite nie otwiera transakcji przed DDL - robimy to jawnie,
+            # żeby nieudana migracja nie zostawiła bazy w połowie przebudowy
+            conn.exec_driver_sql("BEGIN")
+        existing = set(inspect(conn).get_table_names())
+        Base.metadata.create_all(bind=conn)
+        registry_service.ensure(conn)
+
+        if conn.dialect.name != "sqlite":
+            return
+
+        rebuilt = set()
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            if _needs_rebuild(conn, table):
+                _rebuild_table(conn, table)
+                rebuilt.add(table.name)
+            else:
+                # create_all nie dodaje nowych indeksów do istniejących tabel
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+        # Liczniki statystyk liczymy od zera, gdy tabela jest nowa lub podpisy się zmieniły
+        if Signature.__tablename__ in existing and (
+            SignatureStat.__tablename__ not in existing
+            or Signature.__tablename__ in rebuilt
+        ):
+            stats_service.rebuild(conn)
+            print("✅ Przeliczono statystyki podpisów")
+
+        # Przebudowa mogła zmienić zawartość rejestru - stare ETagi list tracą ważność
+        if Signature.__tablename__ in rebuilt:
+            registry_service.bump(conn)
+
+        # Indeks FTS5 (przebudowa, gdy jest nowy lub tabela podpisów zmieniła rowid)
+        search_service.ensure_fts(
+            conn,
+            rebuild=search_service.FTS_TABLE not in existing or Signature.__tablename__ in rebuilt
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        upgrade(create_engine(f"sqlite:///{sys.argv[1]}"))
+    else:
+        upgrade(engine)
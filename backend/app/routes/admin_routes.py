@@ -1,49 +1,79 @@
 """Endpointy administracyjne do przeglądania bazy danych."""
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Dict, Any, Optional
 from datetime import datetime
-import os
+import uuid
 
-from ..database import get_db, Signature, User
-from ..auth import get_current_user
+from .. import config
+from ..database import get_db, get_read_db, Signature, User
+from ..auth import get_current_user, get_events_user, create_events_token
+from ..services import admission_service, crypto_service, stats_service, search_service, export_service, event_hub
+from ..services import listing_service, disk_gc, archive_service, replica_service
+from ..services.file_reaper import reaper
+from ..services import pdf_service
+from ..services.listing_service import (
+    SignatureListResponse,
+    AdminDocumentListResponse,
+    SignatureRecord,
+    DocumentItem
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Liczba id w jednym SELECT / DELETE ... WHERE id IN (...)
+BULK_DELETE_CHUNK = 500
 
-@router.get("/signatures")
+
+def _normalize_ids(ids: List[str]) -> List[str]:
+    """Id w postaci kanonicznej (UUID małymi literami, bez powtórzeń); nie-UUID bez zmian"""
+    normalized = {}
+    for signature_id in ids:
+        try:
+            signature_id = str(uuid.UUID(signature_id))
+        except ValueError:
+            pass
+        normalized[signature_id] = None
+    return list(normalized)
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    username: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+@router.get("/signatures", response_model=SignatureListResponse, response_model_exclude_unset=True)
 async def get_all_signatures(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Lista pól oddzielona przecinkami, np. id,signer_name,created_at"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
-    """Pobiera wszystkie podpisy z bazy danych"""
+    db: Session = Depends(get_read_db)
+):
+    """Pobiera wszystkie podpisy z bazy danych (tylko żądane pola, ETag wersji rejestru)"""
     
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
     
-    signatures = db.query(Signature).order_by(Signature.created_at.desc()).all()
+    spec = listing_service.SIGNATURE_RECORD_FIELDS
+    field_names = listing_service.parse_fields(fields, spec)
     
-    records = []
-    for sig in signatures:
-        records.append({
-            "id": sig.id,
-            "file_hash": sig.file_hash[:32] + "..." if len(sig.file_hash) > 32 else sig.file_hash,
-            "signature_preview": sig.signature_data[:32] + "..." if len(sig.signature_data) > 32 else sig.signature_data,
-            "signer_name": sig.signer_name or "Brak",
-            "signer_location": sig.signer_location or "Brak",
-            "signer_reason": sig.signer_reason or "Brak",
-            "signer_contact": sig.signer_contact or "Brak",
-            "original_filename": sig.original_filename or "Brak",
-            "created_at": sig.created_at.isoformat(),
-            "created_at_formatted": sig.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "username": sig.signer.username
-        })
+    def build():
+        rows = (
+            listing_service.query_projection(db, spec, field_names)
+            .order_by(Signature.created_at.desc())
+            .all()
+        )
+        records = listing_service.build_items(rows, spec, field_names, SignatureRecord)
+        return SignatureListResponse(total_count=len(records), records=records)
     
-    return {
-        "total_count": len(records),
-        "records": records
-    }
+    return listing_service.cached_listing(request, db, build, (tuple(field_names),))
 
 
 @router.get("/signatures/{signature_id}")
@@ -73,33 +103,112 @@ async def get_signature_details(
         "signer_contact": sig.signer_contact,
         "original_filename": sig.original_filename,
         "created_at": sig.created_at.isoformat(),
-        "username": sig.signer.username
+        "username": sig.signer.username,
+        "storage_tier": sig.storage_tier
     }
 
 
+@router.get("/export")
+async def export_signatures(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    after: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Strumieniowy eksport rejestru podpisów (NDJSON lub CSV, opcjonalnie gzip).
+    Każdy wiersz zawiera `cursor` - przekazany jako `after` wznawia eksport za tym wierszem.
+    """
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    try:
+        after_position = export_service.decode_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Nieprawidłowy kursor")
+    
+    filename = f"signatures_export.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_service.iter_export(format, compress=gzip, after=after_position),
+        media_type="application/gzip" if gzip else export_service.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/events/token")
+async def admin_events_token(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Krótki token do strumienia zdarzeń. Przeglądarkowy EventSource nie wysyła
+    nagłówka Authorization, więc dashboard pobiera ten token i łączy się przez
+    `new EventSource("/api/admin/events?token=...")`. Token działa tylko dla /events.
+    """
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return {"token": create_events_token(current_user), "expires_in": config.EVENTS_TOKEN_TTL_SECONDS}
+
+
+@router.get("/events")
+async def admin_events(
+    current_user: User = Depends(get_events_user)
+):
+    """
+    Strumień zdarzeń (Server-Sent Events): signature.created / signature.deleted.
+    Dashboard ładuje listę raz i nakłada zmiany; po zdarzeniu "dropped" przeładowuje listę.
+    Uwierzytelnienie: nagłówek Authorization (fetch) albo ?token= z POST /events/token
+    (EventSource; przy ponownym połączeniu pobierz nowy token).
+    """
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return StreamingResponse(
+        event_hub.stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/events/stats")
+async def admin_events_stats(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Liczba podłączonych klientów SSE, opublikowane i odrzucone"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return event_hub.hub.stats()
+
+
 @router.get("/database/info")
 async def get_database_info(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Zwraca informacje o strukturze bazy danych"""
     
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
     
-    total_signatures = db.query(Signature).count()
+    total_signatures, storage_bytes = stats_service.get_total(db)
     latest_signature = db.query(Signature).order_by(Signature.created_at.desc()).first()
     
     columns = [
-        {"name": "id", "type": "String (UUID)", "description": "Unikalny identyfikator podpisu"},
-        {"name": "file_hash", "type": "String", "description": "Hash SHA-256 pliku PDF (Base64)"},
-        {"name": "signature_data", "type": "Text", "description": "Podpis cyfrowy RSA-PSS (Base64)"},
-        {"name": "public_key_jwk", "type": "Text", "description": "Klucz publiczny w formacie JWK (JSON)"},
+        {"name": "id", "type": "BLOB (UUID, 16 B)", "description": "Unikalny identyfikator podpisu"},
+        {"name": "file_hash", "type": "BLOB (32 B)", "description": "Hash SHA-256 pliku PDF (w API jako Base64)"},
+        {"name": "signature_data", "type": "BLOB", "description": "Podpis cyfrowy RSA-PSS (w API jako Base64)"},
+        {"name": "public_key_thumbprint", "type": "String", "description": "Thumbprint klucza publicznego JWK (RFC 7638), klucz obcy do public_keys"},
         {"name": "signer_name", "type": "String", "description": "Imię i nazwisko osoby podpisującej"},
         {"name": "signer_location", "type": "String", "description": "Lokalizacja osoby podpisującej"},
         {"name": "signer_reason", "type": "String", "description": "Powód podpisania dokumentu"},
         {"name": "signer_contact", "type": "String", "description": "Dane kontaktowe osoby podpisującej"},
         {"name": "original_filename", "type": "String", "description": "Oryginalna nazwa pliku PDF"},
+        {"name": "file_size", "type": "Integer", "description": "Rozmiar podpisanego PDF w bajtach"},
         {"name": "created_at", "type": "DateTime", "description": "Data utworzenia rekordu (UTC)"}
     ]
     
@@ -107,11 +216,73 @@ async def get_database_info(
         "database": "SQLite",
         "table_name": "signatures",
         "total_records": total_signatures,
+        "storage_bytes": storage_bytes,
         "latest_signature_date": latest_signature.created_at.isoformat() if latest_signature else None,
-        "columns": columns
+        "columns": columns,
+        "read_replica": replica_service.get_status()
+    }
+
+
+@router.get("/admission")
+async def get_admission_stats(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Zwraca stan kolejek admission control (głębokość, odrzucenia)"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return admission_service.get_stats()
+
+
+@router.get("/caches")
+async def get_cache_stats(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Zwraca liczniki cache'y w pamięci procesu"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return {
+        "public_keys": crypto_service.get_public_key_cache_stats(),
+        "verification_results": crypto_service.get_verification_cache_stats(),
+        "listing_pages": listing_service.get_page_cache_stats()
     }
 
 
+@router.get("/pdf-optimization")
+async def get_pdf_optimization_stats(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Suma rozmiarów PDF przed i po optymalizacji (od startu procesu)"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    stats = dict(pdf_service.optimization_stats)
+    stats["enabled_by_default"] = config.PDF_OPTIMIZE
+    stats["saved_bytes"] = stats["bytes_before"] - stats["bytes_after"]
+    stats["saved_ratio"] = (
+        round(stats["saved_bytes"] / stats["bytes_before"], 4) if stats["bytes_before"] else 0.0
+    )
+    return stats
+
+
+@router.get("/statistics")
+async def get_statistics(
+    days: int = Query(30, ge=1, le=366, description="Liczba ostatnich dni w statystykach dziennych"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """Statystyki podpisów: suma, per użytkownik, per dzień (ostatnie `days`), per powód"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return stats_service.get_statistics(db, days=days)
+
+
 @router.delete("/signatures/{signature_id}")
 async def delete_signature(
     signature_id: str,
@@ -128,56 +299,285 @@ async def delete_signature(
     if not sig:
         raise HTTPException(status_code=404, detail="Signature not found")
     
-    # Usuń plik z dysku jeśli istnieje
-    if sig.signed_pdf_path and os.path.exists(sig.signed_pdf_path):
-        try:
-            os.remove(sig.signed_pdf_path)
-        except Exception as e:
-            print(f"Błąd usuwania pliku: {e}")
-    
+    stats_service.record_delete(db, sig)
     db.delete(sig)
     db.commit()
     
+    # Plik (lub fragment paczki archiwum) usuwany w tle, dopiero po zatwierdzeniu transakcji
+    reaper.submit([sig.signed_pdf_path])
+    archive_service.submit_discard([archive_service.archived_member(sig)])
+    crypto_service.invalidate_verification_cache(sig.signature_data)
+    event_hub.hub.publish("signature.deleted", {"id": signature_id})
+    
     return {"status": "success", "message": f"Signature {signature_id} deleted"}
 
 
-@router.get("/documents")
+@router.post("/signatures/bulk-delete")
+async def bulk_delete_signatures(
+    request: BulkDeleteRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Usuwa wiele podpisów w jednej transakcji: po liście id i/lub filtrze
+    (username, date_from, date_to). Pliki są usuwane w tle.
+    """
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mogą usuwać")
+    
+    if not (request.ids or request.username or request.date_from or request.date_to):
+        raise HTTPException(
+            status_code=400,
+            detail="Podaj listę ids lub filtr (username, date_from, date_to)"
+        )
+    
+    # Tylko kolumny potrzebne do statystyk, cache'y, plików i paczek archiwum
+    query = db.query(
+        Signature.id,
+        Signature.user_id,
+        Signature.created_at,
+        Signature.signer_reason,
+        Signature.file_size,
+        Signature.signature_data,
+        Signature.signed_pdf_path,
+        Signature.storage_tier,
+        Signature.archive_pack,
+        Signature.archive_offset,
+        Signature.archive_length
+    )
+    if request.username:
+        query = query.join(User, Signature.user_id == User.id).filter(User.username == request.username)
+    if request.date_from:
+        query = query.filter(Signature.created_at >= request.date_from)
+    if request.date_to:
+        query = query.filter(Signature.created_at < request.date_to)
+    
+    if request.ids:
+        # Lista id czytana porcjami - limit zmiennych SQLite w IN (...)
+        requested_ids = _normalize_ids(request.ids)
+        rows = []
+        for start in range(0, len(requested_ids), BULK_DELETE_CHUNK):
+            rows += (
+                query.filter(Signature.id.in_(requested_ids[start:start + BULK_DELETE_CHUNK]))
+                .limit(config.BULK_DELETE_MAX + 1 - len(rows))
+                .all()
+            )
+            if len(rows) > config.BULK_DELETE_MAX:
+                break
+    else:
+        requested_ids = []
+        rows = query.limit(config.BULK_DELETE_MAX + 1).all()
+    if len(rows) > config.BULK_DELETE_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Zbyt wiele podpisów do usunięcia naraz (limit {config.BULK_DELETE_MAX}), zawęź filtr"
+        )
+    
+    deleted_ids = [row.id for row in rows]
+    for start in range(0, len(deleted_ids), BULK_DELETE_CHUNK):
+        db.execute(
+            delete(Signature).where(Signature.id.in_(deleted_ids[start:start + BULK_DELETE_CHUNK])),
+            execution_options={"synchronize_session": False}
+        )
+    stats_service.record_bulk_delete(db, rows)
+    db.commit()
+    
+    reaper.submit([row.signed_pdf_path for row in rows])
+    archive_service.submit_discard([archive_service.archived_member(row) for row in rows])
+    for row in rows:
+        crypto_service.invalidate_verification_cache(row.signature_data)
+    if deleted_ids:
+        event_hub.hub.publish("signature.bulk_deleted", {"ids": deleted_ids, "count": len(deleted_ids)})
+    
+    print(f"🗑️ Bulk delete: {len(deleted_ids)} podpisów, pliki przekazane do usunięcia w tle")
+    
+    return {
+        "status": "success",
+        "deleted": len(deleted_ids),
+        "not_matched": len(set(requested_ids) - set(deleted_ids)),
+        "files_queued": sum(1 for row in rows if row.signed_pdf_path),
+        "ids": deleted_ids
+    }
+
+
+@router.get("/reaper")
+async def get_reaper_stats(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Zwraca stan kolejki usuwania plików w tle"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return reaper.stats()
+
+
+@router.post("/gc")
+async def run_disk_gc(
+    dry_run: bool = Query(True, description="Tylko raport, bez usuwania plików"),
+    force: bool = Query(False, description="Przenieś osierocone podpisane PDF-y mimo bezpiecznika"),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Uruchamia sprzątanie dysku (staging, stare pliki tymczasowe, signed_pdfs vs baza).
+    Podpisane PDF-y bez rekordu trafiają do kwarantanny (GC_QUARANTINE_DIR), nie są usuwane.
+    """
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return await run_in_threadpool(disk_gc.sweep, dry_run, None, force)
+
+
+@router.get("/gc")
+async def get_disk_gc_report(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Raport ostatniego sprzątania dysku (bez dry_run)"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return {
+        "interval_seconds": config.GC_INTERVAL_SECONDS,
+        "scheduled_orphans": config.GC_SCHEDULED_ORPHANS,
+        "quarantine_dir": str(config.GC_QUARANTINE_DIR),
+        "last_report": disk_gc.last_report
+    }
+
+
+@router.post("/archive")
+async def run_archive(
+    older_than_days: Optional[int] = Query(None, ge=0, description="Domyślnie ARCHIVE_AFTER_DAYS"),
+    dry_run: bool = Query(True, description="Tylko raport, bez przenoszenia plików"),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Przenosi stare podpisane PDF-y do skompresowanych paczek archiwum"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return await run_in_threadpool(archive_service.archive_old, older_than_days, dry_run)
+
+
+@router.post("/archive/compact")
+async def run_archive_compaction(
+    min_dead_fraction: Optional[float] = Query(
+        None, ge=0, le=1, description="Domyślnie ARCHIVE_COMPACT_MIN_DEAD_FRACTION"
+    ),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Przepisuje paczki archiwum z dużą częścią usuniętych dokumentów (odzyskuje miejsce)"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return await run_in_threadpool(archive_service.compact, min_dead_fraction)
+
+
+@router.get("/archive")
+async def get_archive_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+) -> Dict[str, Any]:
+    """Stan warstw przechowywania (hot / archive) i paczek archiwum"""
+    
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    return archive_service.get_stats(db)
+
+
+@router.get("/documents", response_model=AdminDocumentListResponse, response_model_exclude_unset=True)
 async def list_all_documents(
+    request: Request,
     username: str = None,
+    fields: Optional[str] = Query(None, description="Lista pól oddzielona przecinkami, np. id,filename,signed_at"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Lista wszystkich dokumentów (opcjonalnie filtruj po username)"""
+    """Lista wszystkich dokumentów (opcjonalnie filtruj po username, tylko żądane pola, ETag)"""
     
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
     
-    query = db.query(Signature)
+    spec = listing_service.DOCUMENT_FIELDS
+    field_names = listing_service.parse_fields(fields, spec)
     
-    # Filtruj po username jeśli podano
-    if username:
-        query = query.join(User).filter(User.username == username)
+    def build():
+        # username potrzebny zawsze - do grupowania i filtrowania
+        query = listing_service.query_projection(
+            db, spec, field_names, extra_columns={"group_username": User.username}
+        )
+        
+        # Filtruj po username jeśli podano
+        if username:
+            query = query.filter(User.username == username)
+        
+        rows = query.order_by(Signature.created_at.desc()).all()
+        documents = listing_service.build_items(rows, spec, field_names, DocumentItem)
+        
+        # Grupuj według użytkowników (w grupach bez pola username, jak dotychczas)
+        grouped_fields = [name for name in field_names if name != 'username']
+        users_dict = {}
+        for row, doc in zip(rows, documents):
+            users_dict.setdefault(row.group_username, []).append(
+                DocumentItem.model_construct(**{name: getattr(doc, name) for name in grouped_fields})
+            )
+        
+        return AdminDocumentListResponse(
+            total=len(documents),
+            users=users_dict,
+            documents=documents
+        )
     
-    documents = query.order_by(Signature.created_at.desc()).all()
+    return listing_service.cached_listing(request, db, build, (tuple(field_names), username))
+
+
+@router.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1, description="Szukany tekst (podpisujący, lokalizacja, powód, kontakt, nazwa pliku)"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("rank", pattern="^(rank|recent)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Wyszukiwanie pełnotekstowe dokumentów (FTS5), wyniki wg trafności lub od najnowszych"""
     
-    # Grupuj według użytkowników
-    users_dict = {}
-    for doc in documents:
-        user_username = doc.signer.username
-        if user_username not in users_dict:
-            users_dict[user_username] = []
-        users_dict[user_username].append({
-            'id': doc.id,
-            'filename': doc.original_filename,
-            'signer': doc.signer_name,
-            'signed_at': doc.created_at.isoformat(),
-            'location': doc.signer_location,
-            'reason': doc.signer_reason
-        })
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Tylko administratorzy mają dostęp")
+    
+    if db.bind.dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Wyszukiwanie wymaga bazy SQLite (FTS5)")
+    
+    if not search_service.build_match_query(q):
+        raise HTTPException(status_code=400, detail="Puste zapytanie")
+    
+    hits, has_more = search_service.search_signatures(
+        db, q, date_from=date_from, date_to=date_to, limit=limit, offset=offset, sort=sort
+    )
+    
+    # Dociągnij rekordy (z użytkownikami) stałą liczbą zapytań i zachowaj kolejność wg trafności
+    ranks = dict(hits)
+    documents = (
+        db.query(Signature)
+        .options(selectinload(Signature.signer))
+        .filter(Signature.id.in_(list(ranks)))
+        .all()
+    ) if ranks else []
+    order = {doc_id: position for position, (doc_id, _) in enumerate(hits)}
+    documents.sort(key=lambda doc: order[doc.id])
     
     return {
-        'total': len(documents),
-        'users': users_dict,
+        'query': q,
+        'sort': sort,
+        'limit': limit,
+        'offset': offset,
+        'has_more': has_more,
         'documents': [
             {
                 'id': doc.id,
@@ -186,7 +586,9 @@ async def list_all_documents(
                 'username': doc.signer.username,
                 'signed_at': doc.created_at.isoformat(),
                 'location': doc.signer_location,
-                'reason': doc.signer_reason
+                'reason': doc.signer_reason,
+                'contact': doc.signer_contact,
+                'rank': ranks[doc.id]
             }
             for doc in documents
         ]
@@ -209,15 +611,15 @@ async def delete_document(
     if not document:
         raise HTTPException(status_code=404, detail="Dokument nie znaleziony")
     
-    # Usuń plik z dysku jeśli istnieje
-    if document.signed_pdf_path and os.path.exists(document.signed_pdf_path):
-        try:
-            os.remove(document.signed_pdf_path)
-        except Exception as e:
-            print(f"Błąd usuwania pliku: {e}")
-    
     # Usuń z bazy
+    stats_service.record_delete(db, document)
     db.delete(document)
     db.commit()
     
+    # Plik (lub fragment paczki archiwum) usuwany w tle, dopiero po zatwierdzeniu transakcji
+    reaper.submit([document.signed_pdf_path])
+    archive_service.submit_discard([archive_service.archived_member(document)])
+    crypto_service.invalidate_verification_cache(document.signature_data)
+    event_hub.hub.publish("signature.deleted", {"id": document_id})
+    
     return {"message": "Dokument usunięty", "filename": document.original_filename}
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from PyPDF2 import PdfReader
 import json
 import os
 import tempfile
@@ -9,19 +9,25 @@ import hashlib
 import base64
 import shutil
 import io
+import uuid
 from datetime import datetime
-from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
 
-from ..database import get_db, Signature, User
-from ..services import crypto_service
+from ..database import get_db, get_read_db, get_or_create_public_key, Signature, User
+from ..services import crypto_service, admission_service, stats_service, event_hub
+from ..services import listing_service
+from ..services.listing_service import SignedPdfListResponse, DocumentItem
 from ..services.pdf_service import PdfService
-from ..auth import get_current_user
+from ..services.disk_gc import STAGING_PREFIX
+from ..services import archive_service
+from ..auth import get_current_user, get_optional_username
+from .. import config
 
 router = APIRouter(prefix="/signature", tags=["signature"])
 
-# Folder na podpisane PDF-y
-SIGNED_PDF_DIR = Path("signed_pdfs")
-SIGNED_PDF_DIR.mkdir(exist_ok=True)
+# Folder na podpisane PDF-y (tworzony przy starcie aplikacji)
+SIGNED_PDF_DIR = config.SIGNED_PDF_DIR
 
 
 def calculate_sha256_hash(data: bytes) -> str:
@@ -30,6 +36,56 @@ def calculate_sha256_hash(data: bytes) -> str:
     return base64.b64encode(hash_bytes).decode('utf-8')
 
 
+def _staged_file_path(temp_file_path: str) -> str:
+    """Ścieżka pliku z prepare - akceptowane tylko pliki z folderów staging"""
+    real_path = os.path.realpath(temp_file_path)
+    staging_root = os.path.realpath(config.STAGING_DIR)
+    staging_dir = os.path.dirname(real_path)
+    if (
+        os.path.dirname(staging_dir) != staging_root
+        or not os.path.basename(staging_dir).startswith(STAGING_PREFIX)
+    ):
+        raise HTTPException(400, "Nieprawidłowa ścieżka pliku tymczasowego")
+    return real_path
+
+
+def _attachment_header(filename: str) -> str:
+    """Nagłówek Content-Disposition (jak w FileResponse, także dla nazw spoza ASCII)"""
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        return f"attachment; filename*=utf-8''{quoted_filename}"
+    return f'attachment; filename="{filename}"'
+
+
+def _ensure_not_signed(pdf_content: bytes):
+    """Blokuje ponowne podpisanie dokumentu, który ma już /Signature"""
+    from PyPDF2 import PdfReader
+    
+    try:
+        pdf_reader = PdfReader(io.BytesIO(pdf_content))
+        
+        print(f"📄 PDF Metadata obecne: {pdf_reader.metadata is not None}")
+        if pdf_reader.metadata:
+            print(f"📄 Klucze metadanych: {list(pdf_reader.metadata.keys())}")
+            print(f"📄 /Signature present: {'/Signature' in pdf_reader.metadata}")
+            
+            if '/Signature' in pdf_reader.metadata:
+                print("🚫 BLOKOWANIE - Dokument już podpisany!")
+                raise HTTPException(
+                    status_code=400,
+                    detail="❌ Ten dokument jest już podpisany! Nie można ponownie podpisać podpisanego dokumentu."
+                )
+            else:
+                print("✅ OK - Dokument nie ma podpisu, można podpisać")
+        else:
+            print("⚠️ Brak metadanych w PDF")
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"⚠️ Błąd sprawdzania metadanych: {e}")
+
+
 @router.get("/")
 async def signature_root():
     return {"message": "Signature API"}
@@ -39,73 +95,55 @@ async def signature_root():
 async def prepare_signature_with_metadata(
     file: UploadFile = File(...),
     metadata: str = Form(...),
+    optimize: Optional[bool] = Form(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Przygotowuje plik do podpisania"""
-    try:
-        pdf_content = await file.read()
-        metadata_dict = json.loads(metadata)
+    """Przygotowuje plik do podpisania (opcjonalnie zmniejsza PDF przed obliczeniem hasha)"""
+    async with admission_service.admit("prepare", current_user.id):
+        try:
+            pdf_content = await file.read()
+            metadata_dict = json.loads(metadata)
         
-        print(f"\n📄 SPRAWDZANIE PLIKU: {file.filename}")
+            print(f"\n📄 SPRAWDZANIE PLIKU: {file.filename}")
         
-        # Sprawdź czy PDF już ma podpis
-        try:
-            pdf_reader = PdfReader(io.BytesIO(pdf_content))
-            
-            print(f"📄 PDF Metadata obecne: {pdf_reader.metadata is not None}")
-            if pdf_reader.metadata:
-                print(f"📄 Klucze metadanych: {list(pdf_reader.metadata.keys())}")
-                print(f"📄 /Signature present: {'/Signature' in pdf_reader.metadata}")
-                
-                if '/Signature' in pdf_reader.metadata:
-                    print("🚫 BLOKOWANIE - Dokument już podpisany!")
-                    raise HTTPException(
-                        status_code=400,
-                        detail="❌ Ten dokument jest już podpisany! Nie można ponownie podpisać podpisanego dokumentu."
-                    )
-                else:
-                    print("✅ OK - Dokument nie ma podpisu, można podpisać")
-            else:
-                print("⚠️ Brak metadanych w PDF")
-                
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"⚠️ Błąd sprawdzania metadanych: {e}")
+            # Sprawdź czy PDF już ma podpis
+            await run_in_threadpool(_ensure_not_signed, pdf_content)
         
-        # WAŻNE - Oblicz hash ZAWARTOŚCI (bez metadanych)
-        from ..services.crypto_service import calculate_pdf_content_hash
-        file_hash_bytes = calculate_pdf_content_hash(pdf_content)
-        file_hash_b64 = base64.b64encode(file_hash_bytes).decode('utf-8')
+            # Optymalizacja PRZED hashem - podpisywana jest już zoptymalizowana zawartość
+            optimization = None
+            if config.PDF_OPTIMIZE if optimize is None else optimize:
+                pdf_content, optimization = await run_in_threadpool(PdfService.optimize_pdf, pdf_content)
         
-        print(f"📊 Hash zawartości do podpisania: {file_hash_b64[:64]}...")
+            # WAŻNE - Oblicz hash ZAWARTOŚCI (bez metadanych)
+            from ..services.crypto_service import calculate_pdf_content_hash
+            file_hash_bytes = await run_in_threadpool(calculate_pdf_content_hash, pdf_content)
+            file_hash_b64 = base64.b64encode(file_hash_bytes).decode('utf-8')
         
-        # Zapisz plik tymczasowo
-        temp_dir = tempfile.mkdtemp()
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
-        filename = file.filename or "document.pdf"
+            print(f"📊 Hash zawartości do podpisania: {file_hash_b64[:64]}...")
         
-        original_path = os.path.join(temp_dir, f"orig_{timestamp}_{filename}")
-        temp_signed_path = os.path.join(temp_dir, f"temp_{timestamp}_{filename}")
+            # Zapisz plik tymczasowo (folder staging sprzątany przez disk_gc)
+            temp_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=config.STAGING_DIR)
+            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+            filename = os.path.basename(file.filename or "document.pdf")
         
-        with open(original_path, "wb") as f:
-            f.write(pdf_content)
+            temp_signed_path = os.path.join(temp_dir, f"temp_{timestamp}_{filename}")
         
-        # Skopiuj plik
-        shutil.copy(original_path, temp_signed_path)
+            with open(temp_signed_path, "wb") as f:
+                f.write(pdf_content)
         
-        return {
-            "success": True,
-            "file_hash": file_hash_b64,
-            "temp_file_path": temp_signed_path,
-            "original_filename": filename
-        }
+            return {
+                "success": True,
+                "file_hash": file_hash_b64,
+                "temp_file_path": temp_signed_path,
+                "original_filename": filename,
+                "optimization": optimization
+            }
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(500, f"Error: {str(e)}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(500, f"Error: {str(e)}")
 
 
 
@@ -119,99 +157,125 @@ async def embed_signature_to_db(
     db: Session = Depends(get_db)
 ):
     """Osadza podpis w PDF i zapisuje w bazie danych"""
-    try:
-        metadata_dict = json.loads(metadata)
+    async with admission_service.admit("embed", current_user.id):
+        try:
+            metadata_dict = json.loads(metadata)
         
-        # Wczytaj PDF
-        if not os.path.exists(temp_file_path):
-            raise HTTPException(404, "Temporary file not found")
+            # Sprawdź format klucza publicznego zanim osadzimy podpis
+            try:
+                crypto_service.jwk_thumbprint(json.loads(public_key))
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                raise HTTPException(400, "Nieprawidłowy format klucza publicznego")
         
-        with open(temp_file_path, 'rb') as f:
-            pdf_content = f.read()
+            # Podpis zapisujemy w bazie jako surowe bajty
+            try:
+                base64.b64decode(signature, validate=True)
+            except ValueError:
+                raise HTTPException(400, "Nieprawidłowy format podpisu (oczekiwano Base64)")
         
-        # Oblicz hash
-        from ..services.crypto_service import calculate_pdf_content_hash
-        file_hash_bytes = calculate_pdf_content_hash(pdf_content)
-        file_hash_b64 = base64.b64encode(file_hash_bytes).decode('utf-8')
+            # Wczytaj PDF
+            temp_file_path = _staged_file_path(temp_file_path)
+            if not os.path.exists(temp_file_path):
+                raise HTTPException(404, "Temporary file not found")
         
-        # Utwórz unikalną nazwę pliku
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{current_user.username}_{timestamp}_{metadata_dict.get('filename', 'document.pdf')}"
-        signed_pdf_path = SIGNED_PDF_DIR / safe_filename
+            with open(temp_file_path, 'rb') as f:
+                pdf_content = f.read()
         
-        # Dodaj timestamp do metadanych
-        metadata_dict['timestamp'] = datetime.utcnow().isoformat()
+            # Oblicz hash
+            from ..services.crypto_service import calculate_pdf_content_hash
+            file_hash_bytes = await run_in_threadpool(calculate_pdf_content_hash, pdf_content)
+            file_hash_b64 = base64.b64encode(file_hash_bytes).decode('utf-8')
         
-        # OSADŹ PODPIS W PDF
-        success = PdfService.embed_signature_in_pdf(
-            input_pdf_path=temp_file_path,
-            output_pdf_path=str(signed_pdf_path),
-            signature_data=signature,
-            file_hash=file_hash_b64,
-            metadata=metadata_dict
-        )
+            # Utwórz unikalną nazwę pliku - id podpisu w nazwie, żeby dwa embedy
+            # w tej samej sekundzie nie nadpisały (ani nie usunęły) swoich plików
+            signature_id = str(uuid.uuid4())
+            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+            safe_filename = f"{current_user.username}_{timestamp}_{signature_id}_{metadata_dict.get('filename', 'document.pdf')}"
+            signed_pdf_path = SIGNED_PDF_DIR / safe_filename
         
-        if not success:
-            raise HTTPException(500, "Nie udało się osadzić podpisu w PDF")
+            # Dodaj timestamp do metadanych
+            metadata_dict['timestamp'] = datetime.utcnow().isoformat()
         
-        # Zapisz w bazie
-        new_signature = Signature(
-            user_id=current_user.id,
-            file_hash=file_hash_b64,
-            signature_data=signature,
-            public_key_jwk=public_key,
-            signer_name=metadata_dict.get('name'),
-            signer_location=metadata_dict.get('location'),
-            signer_reason=metadata_dict.get('reason'),
-            signer_contact=metadata_dict.get('contact'),
-            original_filename=metadata_dict.get('filename'),
-            signed_pdf_path=str(signed_pdf_path)
-        )
+            try:
+                # OSADŹ PODPIS W PDF
+                success = await run_in_threadpool(
+                    PdfService.embed_signature_in_pdf,
+                    input_pdf_path=temp_file_path,
+                    output_pdf_path=str(signed_pdf_path),
+                    signature_data=signature,
+                    file_hash=file_hash_b64,
+                    metadata=metadata_dict
+                )
+            
+                if not success:
+                    raise HTTPException(500, "Nie udało się osadzić podpisu w PDF")
+            
+                # Zapisz w bazie (klucz publiczny trafia do tabeli public_keys raz)
+                new_signature = Signature(
+                    id=signature_id,
+                    user_id=current_user.id,
+                    file_hash=file_hash_b64,
+                    signature_data=signature,
+                    public_key=get_or_create_public_key(db, public_key),
+                    signer_name=metadata_dict.get('name'),
+                    signer_location=metadata_dict.get('location'),
+                    signer_reason=metadata_dict.get('reason'),
+                    signer_contact=metadata_dict.get('contact'),
+                    original_filename=metadata_dict.get('filename'),
+                    signed_pdf_path=str(signed_pdf_path),
+                    file_size=os.path.getsize(signed_pdf_path)
+                )
+            
+                db.add(new_signature)
+                db.flush()
+                stats_service.record_insert(db, new_signature)
+                db.commit()
+            except Exception:
+                # Bez rekordu w bazie plik byłby osierocony
+                db.rollback()
+                if os.path.exists(signed_pdf_path):
+                    os.remove(signed_pdf_path)
+                raise
         
-        db.add(new_signature)
-        db.commit()
+            event_hub.hub.publish("signature.created", event_hub.signature_event_data(new_signature))
         
-        # Usuń tymczasowy plik
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+            # Usuń folder tymczasowy z prepare
+            shutil.rmtree(os.path.dirname(temp_file_path), ignore_errors=True)
         
-        return {
-            "success": True,
-            "message": "✅ PDF podpisany i zapisany w systemie!",
-            "signature_id": new_signature.id,
-            "filename": safe_filename
-        }
+            return {
+                "success": True,
+                "message": "✅ PDF podpisany i zapisany w systemie!",
+                "signature_id": new_signature.id,
+                "filename": safe_filename
+            }
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(500, f"Error: {str(e)}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(500, f"Error: {str(e)}")
 
 
-@router.get("/signed-pdfs")
+@router.get("/signed-pdfs", response_model=SignedPdfListResponse, response_model_exclude_unset=True)
 async def list_signed_pdfs(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Lista pól oddzielona przecinkami, np. id,filename,signed_at"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Lista wszystkich podpisanych PDF-ów"""
-    signatures = db.query(Signature).order_by(Signature.created_at.desc()).all()
+    """Lista wszystkich podpisanych PDF-ów (tylko żądane pola, ETag wersji rejestru)"""
+    spec = listing_service.DOCUMENT_FIELDS
+    field_names = listing_service.parse_fields(fields, spec)
     
-    return {
-        "success": True,
-        "count": len(signatures),
-        "documents": [
-            {
-                "id": sig.id,
-                "filename": sig.original_filename,
-                "signer": sig.signer_name,
-                "username": sig.signer.username,
-                "signed_at": sig.created_at.isoformat(),
-                "location": sig.signer_location,
-                "reason": sig.signer_reason
-            }
-            for sig in signatures
-        ]
-    }
+    def build():
+        rows = (
+            listing_service.query_projection(db, spec, field_names)
+            .order_by(Signature.created_at.desc())
+            .all()
+        )
+        documents = listing_service.build_items(rows, spec, field_names, DocumentItem)
+        return SignedPdfListResponse(success=True, count=len(documents), documents=documents)
+    
+    return listing_service.cached_listing(request, db, build, (tuple(field_names),))
 
 
 @router.get("/download-signed-pdf/{signature_id}")
@@ -226,6 +290,23 @@ async def download_signed_pdf(
     if not signature:
         raise HTTPException(404, "Podpis nie znaleziony")
     
+    # Stary dokument - strumień z paczki archiwum (tylko jego fragment)
+    if signature.storage_tier == archive_service.ARCHIVE_TIER:
+        if not os.path.exists(archive_service.pack_path(signature.archive_pack)):
+            raise HTTPException(404, "Paczka archiwum nie istnieje na serwerze")
+        headers = {
+            "Content-Disposition": _attachment_header(signature.original_filename or "signed_document.pdf")
+        }
+        if signature.file_size is not None:
+            headers["Content-Length"] = str(signature.file_size)
+        return StreamingResponse(
+            archive_service.iter_archived(
+                signature.archive_pack, signature.archive_offset, signature.archive_length
+            ),
+            media_type='application/pdf',
+            headers=headers
+        )
+    
     if not signature.signed_pdf_path or not os.path.exists(signature.signed_pdf_path):
         raise HTTPException(404, "Plik nie istnieje na serwerze")
     
@@ -273,20 +354,14 @@ async def download_public_key(
             "description": "Klucz publiczny do weryfikacji podpisu cyfrowego"
         }
         
-        # Utwórz tymczasowy plik JSON
-        temp_dir = tempfile.mkdtemp()
+        # Plik JSON generowany w pamięci (bez pliku tymczasowego na dysku)
         safe_filename = signature.original_filename.replace('.pdf', '') if signature.original_filename else 'document'
         json_filename = f"public_key_{safe_filename}.json"
-        json_path = os.path.join(temp_dir, json_filename)
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(key_file_content, f, indent=2, ensure_ascii=False)
         
-        return FileResponse(
-            json_path,
-            filename=json_filename,
+        return Response(
+            content=json.dumps(key_file_content, indent=2, ensure_ascii=False),
             media_type='application/json',
-            background=None  # Nie usuwaj pliku automatycznie
+            headers={"Content-Disposition": _attachment_header(json_filename)}
         )
         
     except json.JSONDecodeError:
@@ -297,33 +372,38 @@ async def download_public_key(
 
 @router.post("/verify-signature")
 async def verify_signature(
+    request: Request,
     file: UploadFile = File(...),
-    public_key: str = Form(...)
+    public_key: str = Form(...),
+    username: Optional[str] = Depends(get_optional_username)
 ):
-    """Weryfikuje podpis cyfrowy PDF"""
-    try:
-        # Wczytaj klucz publiczny z JSON stringa
-        public_key_jwk = json.loads(public_key)
+    """Weryfikuje podpis cyfrowy PDF (limit na użytkownika: token, inaczej adres klienta)"""
+    async with admission_service.admit("verify", admission_service.client_key(request, username)):
+        try:
+            # Wczytaj klucz publiczny z JSON stringa
+            public_key_jwk = json.loads(public_key)
         
-        # Wczytaj PDF
-        pdf_content = await file.read()
+            # Wczytaj PDF
+            pdf_content = await file.read()
         
-        # Weryfikuj używając crypto_service
-        result = crypto_service.verify_pdf_signature(pdf_content, public_key_jwk)
+            # Weryfikuj używając crypto_service
+            result = await run_in_threadpool(
+                crypto_service.verify_pdf_signature, pdf_content, public_key_jwk
+            )
         
-        if result['valid']:
-            return {
-                'valid': True,
-                'message': 'Podpis jest prawidłowy!',
-                'metadata': result.get('metadata')
-            }
-        else:
-            return {
-                'valid': False,
-                'message': result.get('error', 'Podpis nieprawidłowy')
-            }
+            if result['valid']:
+                return {
+                    'valid': True,
+                    'message': 'Podpis jest prawidłowy!',
+                    'metadata': result.get('metadata')
+                }
+            else:
+                return {
+                    'valid': False,
+                    'message': result.get('error', 'Podpis nieprawidłowy')
+                }
             
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Nieprawidłowy format klucza publicznego")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Błąd weryfikacji: {str(e)}")
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Nieprawidłowy format klucza publicznego")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Błąd weryfikacji: {str(e)}")
@@ -0,0 +1,219 @@
+"""
+Admission control dla endpointów obciążających CPU.
+
+Każda klasa endpointów (prepare / embed / verify) ma własny limit
+równoległości i ograniczoną kolejkę oczekujących. Kolejka jest obsługiwana
+round-robin po użytkownikach, żeby jeden klient wysyłający dużo żądań
+nie blokował pozostałych. Gdy kolejka jest pełna, żądanie jest od razu
+odrzucane z 503 i nagłówkiem Retry-After.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from .. import config
+
+
+class AdmissionController:
+    """Limit równoległości z ograniczoną, sprawiedliwą kolejką"""
+
+    # Waga nowego pomiaru w średniej kroczącej czasu obsługi
+    EWMA_ALPHA = 0.2
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        max_per_user: int,
+        queue_timeout: float,
+        initial_service_time: float
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._queued = 0
+        self._waiting = OrderedDict()  # user_key -> deque[Future]
+        self._per_user = {}            # user_key -> aktywne + oczekujące
+        self._service_time = initial_service_time
+
+        # Liczniki dla operatora
+        self.admitted = 0
+        self.completed = 0
+        self.rejected_queue_full = 0
+        self.rejected_per_user = 0
+        self.rejected_timeout = 0
+        self.max_queue_depth_seen = 0
+
+    def retry_after(self) -> int:
+        """Szacuje (w sekundach), kiedy kolejka zdąży się opróżnić"""
+        waves = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(waves * self._service_time))
+
+    def _reject(self, status_code: int, detail: str):
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    async def _acquire(self, user_key: str):
+        if self._per_user.get(user_key, 0) >= self.max_per_user:
+            self.rejected_per_user += 1
+            self._reject(429, "Zbyt wiele równoległych żądań od tego użytkownika")
+
+        # Wolne miejsce i nikt nie czeka - wpuść od razu
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            self._per_user[user_key] = self._per_user.get(user_key, 0) + 1
+            self.admitted += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            self._reject(503, "Serwer jest przeciążony, spróbuj ponownie później")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_key, deque()).append(future)
+        self._queued += 1
+        self._per_user[user_key] = self._per_user.get(user_key, 0) + 1
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self._queued)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                # Miejsce przydzielone w ostatniej chwili - korzystamy z niego
+                self.admitted += 1
+                return
+            self._remove_waiter(user_key, future)
+            self.rejected_timeout += 1
+            self._reject(503, "Przekroczono czas oczekiwania w kolejce")
+        except asyncio.CancelledError:
+            # Klient się rozłączył
+            if future.done():
+                self._release(user_key)
+            else:
+                self._remove_waiter(user_key, future)
+            raise
+
+        self.admitted += 1
+
+    def _remove_waiter(self, user_key: str, future: asyncio.Future):
+        queue = self._waiting.get(user_key)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiting[user_key]
+            self._queued -= 1
+            self._decrement_user(user_key)
+        future.cancel()
+
+    def _decrement_user(self, user_key: str):
+        remaining = self._per_user.get(user_key, 0) - 1
+        if remaining > 0:
+            self._per_user[user_key] = remaining
+        else:
+            self._per_user.pop(user_key, None)
+
+    def _release(self, user_key: str):
+        self._active -= 1
+        self._decrement_user(user_key)
+
+        # Przekaż miejsce następnemu użytkownikowi (round-robin)
+        while self._waiting and self._active < self.max_concurrency:
+            next_user, queue = self._waiting.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._waiting[next_user] = queue
+            self._queued -= 1
+            if future.done():
+                self._decrement_user(next_user)
+                continue
+            self._active += 1
+            future.set_result(True)
+
+    def _observe(self, duration: float):
+        self.completed += 1
+        self._service_time += self.EWMA_ALPHA * (duration - self._service_time)
+
+    @asynccontextmanager
+    async def slot(self, user_key: str):
+        """Rezerwuje miejsce na czas obsługi żądania"""
+        await self._acquire(user_key)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(time.perf_counter() - start)
+            self._release(user_key)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_per_user": self.max_per_user,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "waiting_users": len(self._waiting),
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "avg_service_time": round(self._service_time, 4),
+            "retry_after": self.retry_after(),
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_per_user": self.rejected_per_user,
+            "rejected_timeout": self.rejected_timeout
+        }
+
+
+controllers = {
+    name: AdmissionController(
+        name=name,
+        max_concurrency=limits["max_concurrency"],
+        max_queue=limits["max_queue"],
+        max_per_user=config.ADMISSION_MAX_PER_USER,
+        queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+        initial_service_time=config.ADMISSION_INITIAL_SERVICE_TIME
+    )
+    for name, limits in config.ADMISSION_LIMITS.items()
+}
+
+
+def client_key(request, username: str = None) -> str:
+    """
+    Klucz limitu na użytkownika dla endpointów dostępnych bez logowania:
+    zalogowany użytkownik (z tokenu), a bez tokenu adres klienta.
+    X-Forwarded-For jest brany pod uwagę tylko dla połączeń od zaufanych
+    proxy (TRUSTED_PROXY_IPS) - inaczej klient mógłby wpisać dowolny adres.
+    """
+    if username:
+        return f"user:{username}"
+    address = request.client.host if request.client else "anonymous"
+    if address in config.TRUSTED_PROXY_IPS:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        # Od prawej: pierwszy adres, którego nie dopisało nasze proxy
+        for hop in reversed(forwarded):
+            address = hop
+            if hop not in config.TRUSTED_PROXY_IPS:
+                break
+    return f"ip:{address}"
+
+
+def admit(endpoint_class: str, user_key: str):
+    """Context manager rezerwujący miejsce w danej klasie endpointów"""
+    return controllers[endpoint_class].slot(user_key)
+
+
+def get_stats() -> dict:
+    """Statystyki kolejek dla wszystkich klas endpointów"""
+    return {name: controller.stats() for name, controller in controllers.items()}
@@ -0,0 +1,478 @@
+"""
+Archiwizacja starych podpisanych PDF-ów (warstwy hot / archive).
+
+Pliki starsze niż ARCHIVE_AFTER_DAYS są kompresowane (gzip, osobno każdy
+dokument) i dopisywane na koniec paczki archiwum. Paczki są tylko
+dopisywane, nigdy modyfikowane. Położenie dokumentu (paczka, offset,
+długość) trafia do bazy, więc pobranie czyta tylko jego fragment paczki.
+Obok każdej paczki leży indeks .idx (NDJSON), wystarczający do odtworzenia
+położeń bez bazy.
+Archiwizacja trzyma wyłączną blokadę pliku (flock) w ARCHIVE_DIR, więc
+kilka procesów (workerów) nie dopisuje naraz do tej samej paczki.
+
+Usunięcie zarchiwizowanego podpisu zeruje jego fragment paczki i dopisuje
+do indeksu wpis "deleted" (tombstone) - dokumentu nie da się odzyskać.
+Miejsce wraca przy kompaktowaniu: paczki z dużą częścią martwych bajtów
+są przepisywane (tylko żywe dokumenty) do nowej paczki.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows - bez blokady między procesami (jeden proces w dev)
+    fcntl = None
+
+from sqlalchemy import update, bindparam, func, or_, and_
+
+from .. import config
+from ..database import SessionLocal, Signature
+from .file_reaper import reaper
+
+HOT_TIER = "hot"
+ARCHIVE_TIER = "archive"
+
+PACK_PREFIX = "pack_"
+PACK_SUFFIX = ".pack"
+INDEX_SUFFIX = ".idx"
+LOCK_FILE = ".archive.lock"
+
+# Rozmiar kawałka czytanego z paczki przy pobieraniu
+READ_CHUNK_BYTES = 64 * 1024
+
+_lock = threading.Lock()
+_stop = threading.Event()
+last_report = None
+
+
+def _pack_numbers() -> list:
+    if not config.ARCHIVE_DIR.is_dir():
+        return []
+    numbers = []
+    for path in config.ARCHIVE_DIR.glob(f"{PACK_PREFIX}*{PACK_SUFFIX}"):
+        try:
+            numbers.append(int(path.stem[len(PACK_PREFIX):]))
+        except ValueError:
+            pass
+    return sorted(numbers)
+
+
+def _pack_name(number: int) -> str:
+    return f"{PACK_PREFIX}{number:06d}{PACK_SUFFIX}"
+
+
+def pack_path(pack_name: str) -> str:
+    """Ścieżka paczki (tylko nazwa pliku - bez wychodzenia poza ARCHIVE_DIR)"""
+    return os.path.join(config.ARCHIVE_DIR, os.path.basename(pack_name))
+
+
+@contextmanager
+def _archive_lock():
+    """Wyłączna blokada archiwum między procesami (dopisywanie do paczek + zapis położeń)"""
+    with open(os.path.join(config.ARCHIVE_DIR, LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _index_path(pack_name: str) -> str:
+    return pack_path(pack_name)[:-len(PACK_SUFFIX)] + INDEX_SUFFIX
+
+
+def _compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(config.ARCHIVE_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _PackWriter:
+    """Dopisuje dokumenty do bieżącej paczki; po przekroczeniu rozmiaru zaczyna nową"""
+
+    def __init__(self, fresh: bool = False):
+        # fresh - zacznij od nowej paczki (kompaktowanie nie może pisać do paczek źródłowych)
+        self.fresh = fresh
+        self.name = None
+        self.pack = None
+        self.index = None
+        self.packs = []
+
+    def append(self, signature_id: str, data: bytes) -> tuple:
+        return self.append_compressed(signature_id, _compress(data), len(data))
+
+    def append_compressed(self, signature_id: str, compressed: bytes, size: int) -> tuple:
+        if self.pack is None or self.pack.tell() >= config.ARCHIVE_PACK_MAX_BYTES:
+            self._open_next()
+        offset = self.pack.tell()
+        self.pack.write(compressed)
+        self.index.write(json.dumps({
+            "id": signature_id,
+            "offset": offset,
+            "length": len(compressed),
+            "size": size
+        }) + "\n")
+        return self.name, offset, len(compressed)
+
+    def _open_next(self):
+        self.close()
+        numbers = _pack_numbers()
+        number = numbers[-1] if numbers else 1
+        if self.fresh and not self.packs and numbers:
+            number += 1
+        elif numbers and os.path.getsize(pack_path(_pack_name(number))) >= config.ARCHIVE_PACK_MAX_BYTES:
+            number += 1
+        self.name = _pack_name(number)
+        self.pack = open(pack_path(self.name), "ab")
+        self.pack.seek(0, os.SEEK_END)
+        self.index = open(_index_path(self.name), "a", encoding="utf-8")
+        if self.name not in self.packs:
+            self.packs.append(self.name)
+
+    def sync(self):
+        """Zapisuje dane paczki na dysk (przed zatwierdzeniem położeń w bazie)"""
+        for handle in (self.pack, self.index):
+            if handle is not None:
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def close(self):
+        self.sync()
+        for handle in (self.pack, self.index):
+            if handle is not None:
+                handle.close()
+        self.pack = None
+        self.index = None
+
+
+def _candidates(db, cutoff: datetime, after: tuple = None):
+    query = (
+        db.query(Signature.id, Signature.signed_pdf_path, Signature.created_at)
+        .filter(
+            Signature.storage_tier == HOT_TIER,
+            Signature.created_at < cutoff,
+            Signature.signed_pdf_path.isnot(None)
+        )
+        .order_by(Signature.created_at, Signature.id)
+    )
+    if after is not None:
+        created_at, signature_id = after
+        query = query.filter(or_(
+            Signature.created_at > created_at,
+            and_(Signature.created_at == created_at, Signature.id > signature_id)
+        ))
+    return query.limit(config.ARCHIVE_BATCH_SIZE).all()
+
+
+def archive_old(older_than_days: int = None, dry_run: bool = False) -> dict:
+    """Przenosi podpisane PDF-y starsze niż older_than_days do paczek archiwum"""
+    global last_report
+
+    days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    report = {
+        "dry_run": dry_run,
+        "cutoff": cutoff.isoformat(),
+        "archived": 0,
+        "skipped_missing": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+        "packs": []
+    }
+
+    config.ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    with _lock, _archive_lock():
+        started = time.perf_counter()
+        writer = _PackWriter()
+        db = SessionLocal()
+        try:
+            after = None
+            while True:
+                rows = _candidates(db, cutoff, after)
+                if not rows:
+                    break
+                after = (rows[-1].created_at, rows[-1].id)
+
+                moved = []
+                for row in rows:
+                    if not os.path.exists(row.signed_pdf_path):
+                        report["skipped_missing"] += 1
+                        continue
+                    size = os.path.getsize(row.signed_pdf_path)
+                    report["bytes_before"] += size
+                    if dry_run:
+                        report["archived"] += 1
+                        continue
+                    with open(row.signed_pdf_path, "rb") as f:
+                        pack, offset, length = writer.append(row.id, f.read())
+                    report["bytes_after"] += length
+                    moved.append({
+                        "b_id": row.id,
+                        "b_pack": pack,
+                        "b_offset": offset,
+                        "b_length": length,
+                        "old_path": row.signed_pdf_path
+                    })
+
+                if not moved:
+                    continue
+
+                # Dane w paczce muszą być na dysku, zanim baza na nie wskaże
+                writer.sync()
+                table = Signature.__table__
+                result = db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("b_id"), table.c.storage_tier == HOT_TIER)
+                    .values(
+                        storage_tier=ARCHIVE_TIER,
+                        archive_pack=bindparam("b_pack"),
+                        archive_offset=bindparam("b_offset"),
+                        archive_length=bindparam("b_length"),
+                        signed_pdf_path=None
+                    ),
+                    [{key: value for key, value in item.items() if key != "old_path"} for item in moved]
+                )
+                db.commit()
+                # Wiersz usunięty w międzyczasie nie jest liczony
+                report["archived"] += result.rowcount
+
+                # Pliki z warstwy hot usuwane w tle, dopiero po commit
+                reaper.submit([item["old_path"] for item in moved])
+        finally:
+            writer.close()
+            db.close()
+        report["packs"] = writer.packs
+        report["duration_seconds"] = round(time.perf_counter() - started, 4)
+
+    action = "do archiwizacji" if dry_run else "zarchiwizowano"
+    print(
+        f"📦 Archiwum: {action} {report['archived']} plików "
+        f"({report['bytes_before']} B -> {report['bytes_after']} B), "
+        f"brakujących plików: {report['skipped_missing']}"
+    )
+    if not dry_run:
+        last_report = report
+    return report
+
+
+def archived_member(row):
+    """(id, paczka, offset, długość) dla zarchiwizowanego podpisu, inaczej None"""
+    if row.storage_tier != ARCHIVE_TIER or row.archive_pack is None:
+        return None
+    return row.id, row.archive_pack, row.archive_offset, row.archive_length
+
+
+def _erase_member(signature_id: str, pack_name: str, offset: int, length: int):
+    """Zeruje fragment paczki i dopisuje tombstone do indeksu (wywoływać pod blokadami)"""
+    path = pack_path(pack_name)
+    try:
+        with open(path, "r+b") as pack:
+            if offset + length > os.fstat(pack.fileno()).st_size:
+                raise IOError(f"Fragment poza paczką {pack_name}")
+            pack.seek(offset)
+            remaining = length
+            while remaining > 0:
+                step = min(READ_CHUNK_BYTES, remaining)
+                pack.write(b"\0" * step)
+                remaining -= step
+            pack.flush()
+            os.fsync(pack.fileno())
+    except FileNotFoundError:
+        # Paczka już skompaktowana - usuniętego dokumentu w niej nie ma
+        return
+    with open(_index_path(pack_name), "a", encoding="utf-8") as index:
+        index.write(json.dumps({
+            "id": signature_id,
+            "deleted": True,
+            "offset": offset,
+            "length": length
+        }) + "\n")
+
+
+def discard(members: list):
+    """Trwale usuwa z paczek dokumenty usuniętych podpisów (po commit w bazie)"""
+    members = [member for member in members if member]
+    if not members:
+        return
+    with _lock, _archive_lock():
+        for member in members:
+            try:
+                _erase_member(*member)
+            except Exception as e:
+                print(f"❌ Nie udało się usunąć dokumentu {member[0]} z paczki {member[1]}: {e}")
+
+
+def submit_discard(members: list):
+    """Jak discard, ale w tle - żądanie nie czeka na trwającą archiwizację (blokadę)"""
+    members = [member for member in members if member]
+    if members:
+        threading.Thread(target=discard, args=(members,), name="archive-discard", daemon=True).start()
+
+
+def _live_bytes(db) -> dict:
+    """Suma długości żywych dokumentów w każdej paczce (wg bazy)"""
+    return dict(
+        db.query(Signature.archive_pack, func.sum(Signature.archive_length))
+        .filter(Signature.storage_tier == ARCHIVE_TIER)
+        .group_by(Signature.archive_pack)
+        .all()
+    )
+
+
+def compact(min_dead_fraction: float = None) -> dict:
+    """
+    Przepisuje paczki, w których martwe bajty (usunięte dokumenty) stanowią
+    co najmniej min_dead_fraction rozmiaru: żywe dokumenty są kopiowane bez
+    ponownej kompresji do nowej paczki, położenia w bazie aktualizowane,
+    a stara paczka z indeksem usuwana.
+    """
+    threshold = config.ARCHIVE_COMPACT_MIN_DEAD_FRACTION if min_dead_fraction is None else min_dead_fraction
+    report = {"compacted_packs": [], "moved": 0, "reclaimed_bytes": 0}
+    if not config.ARCHIVE_DIR.is_dir():
+        return report
+
+    with _lock, _archive_lock():
+        started = time.perf_counter()
+        writer = _PackWriter(fresh=True)
+        db = SessionLocal()
+        try:
+            live = _live_bytes(db)
+            for number in _pack_numbers():
+                name = _pack_name(number)
+                size = os.path.getsize(pack_path(name))
+                if name in writer.packs or size == 0 or size - (live.get(name) or 0) < threshold * size:
+                    continue
+
+                rows = (
+                    db.query(Signature.id, Signature.archive_offset, Signature.archive_length, Signature.file_size)
+                    .filter(Signature.storage_tier == ARCHIVE_TIER, Signature.archive_pack == name)
+                    .order_by(Signature.archive_offset)
+                    .all()
+                )
+                moved = []
+                with open(pack_path(name), "rb") as source:
+                    for row in rows:
+                        source.seek(row.archive_offset)
+                        new_pack, offset, length = writer.append_compressed(
+                            row.id, source.read(row.archive_length), row.file_size
+                        )
+                        moved.append({
+                            "b_id": row.id,
+                            "b_old_pack": name,
+                            "b_pack": new_pack,
+                            "b_offset": offset,
+                            "b_length": length
+                        })
+
+                if moved:
+                    writer.sync()
+                    table = Signature.__table__
+                    db.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("b_id"), table.c.archive_pack == bindparam("b_old_pack"))
+                        .values(
+                            archive_pack=bindparam("b_pack"),
+                            archive_offset=bindparam("b_offset"),
+                            archive_length=bindparam("b_length")
+                        ),
+                        moved
+                    )
+                    db.commit()
+                    # Podpis usunięty w trakcie kopiowania - jego kopia nie może zostać w nowej paczce
+                    remaining = {
+                        signature_id for (signature_id,) in db.query(Signature.id)
+                        .filter(Signature.id.in_([item["b_id"] for item in moved]))
+                    }
+                    writer.sync()
+                    for item in moved:
+                        if item["b_id"] not in remaining:
+                            _erase_member(item["b_id"], item["b_pack"], item["b_offset"], item["b_length"])
+
+                os.remove(pack_path(name))
+                if os.path.exists(_index_path(name)):
+                    os.remove(_index_path(name))
+                report["compacted_packs"].append(name)
+                report["moved"] += len(moved)
+                report["reclaimed_bytes"] += size - sum(item["b_length"] for item in moved)
+        finally:
+            writer.close()
+            db.close()
+        report["duration_seconds"] = round(time.perf_counter() - started, 4)
+
+    if report["compacted_packs"]:
+        print(
+            f"📦 Kompaktowanie archiwum: {len(report['compacted_packs'])} paczek, "
+            f"przeniesiono {report['moved']} dokumentów, odzyskano {report['reclaimed_bytes']} B"
+        )
+    return report
+
+
+def iter_archived(pack_name: str, offset: int, length: int):
+    """Strumień rozpakowanego dokumentu - czyta z paczki tylko jego fragment"""
+    decompressor = zlib.decompressobj(31)
+    with open(pack_path(pack_name), "rb") as pack:
+        pack.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = pack.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                raise IOError(f"Paczka {pack_name} jest uszkodzona (za krótka)")
+            remaining -= len(chunk)
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def get_stats(db) -> dict:
+    """Liczba i rozmiar dokumentów w każdej warstwie oraz rozmiar paczek"""
+    tiers = {
+        tier: {"signature_count": count, "storage_bytes": size or 0}
+        for tier, count, size in db.query(
+            Signature.storage_tier, func.count(), func.sum(Signature.file_size)
+        ).group_by(Signature.storage_tier).all()
+    }
+    packs = [_pack_name(number) for number in _pack_numbers()]
+    pack_bytes = sum(os.path.getsize(pack_path(name)) for name in packs)
+    live = _live_bytes(db)
+    return {
+        "tiers": tiers,
+        "packs": len(packs),
+        "pack_bytes": pack_bytes,
+        # Bajty usuniętych dokumentów (wyzerowane) - do odzyskania przez kompaktowanie
+        "dead_bytes": pack_bytes - sum(live.get(name) or 0 for name in packs),
+        "compact_min_dead_fraction": config.ARCHIVE_COMPACT_MIN_DEAD_FRACTION,
+        "archive_after_days": config.ARCHIVE_AFTER_DAYS,
+        "pack_max_bytes": config.ARCHIVE_PACK_MAX_BYTES,
+        "last_report": last_report
+    }
+
+
+def _run_periodically():
+    while not _stop.wait(config.ARCHIVE_INTERVAL_SECONDS):
+        try:
+            archive_old()
+            compact()
+        except Exception as e:
+            print(f"❌ Archiwizacja nieudana: {e}")
+
+
+def start():
+    """Uruchamia cykliczną archiwizację w tle (gdy ARCHIVE_INTERVAL_SECONDS > 0)"""
+    if config.ARCHIVE_INTERVAL_SECONDS <= 0:
+        return
+    _stop.clear()
+    threading.Thread(target=_run_periodically, name="archiver", daemon=True).start()
+
+
+def stop():
+    _stop.set()
@@ -0,0 +1,112 @@
+"""Proste, ograniczone cache'e w pamięci procesu."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe cache LRU z limitem rozmiaru, opcjonalnym TTL
+    i tagami do unieważniania grup wpisów. Z max_bytes wartości (bytes)
+    są dodatkowo ograniczone sumą długości.
+    """
+
+    def __init__(self, max_size: int, ttl: float = None, max_bytes: int = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}             # tag -> set(key)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Zwraca wartość lub None (liczy trafienia i chybienia)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _weight(self, value) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def set(self, key, value, tags=()):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            # Wartość większa niż cały budżet nie jest zapamiętywana
+            if self.max_bytes is not None and self._weight(value) > self.max_bytes:
+                return
+            self._data[key] = (expires_at, value, tuple(tags))
+            self._bytes += self._weight(value)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_size or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, value, tags = self._data.pop(key)
+        self._bytes -= self._weight(value)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                return self._remove(key)
+            return None
+
+    def invalidate_tag(self, tag) -> int:
+        """Usuwa wszystkie wpisy oznaczone tagiem, zwraca ich liczbę"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
@@ -1,18 +1,75 @@
 import json
 import base64
 import hashlib
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.backends import default_backend
-from PyPDF2 import PdfReader, PdfWriter
+import copy
 import io
 
+# PyPDF2 i cryptography importujemy leniwie (w funkcjach) - skraca to zimny start
+
+from .. import config
+from .cache_service import LRUCache
+
+
+# Cache załadowanych kluczy publicznych (klucz: thumbprint JWK wg RFC 7638)
+_public_key_cache = LRUCache(config.PUBLIC_KEY_CACHE_SIZE)
+
+# Cache wyników weryfikacji (klucz: SHA-256 pliku + thumbprint klucza)
+_verification_cache = LRUCache(
+    config.VERIFICATION_CACHE_SIZE,
+    ttl=config.VERIFICATION_CACHE_TTL
+)
+
+
+def _base64url_to_int(data: str) -> int:
+    """Dekoduje liczbę zapisaną w base64url (bez paddingu, jak w JWK)"""
+    return int.from_bytes(base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)), byteorder='big')
+
+
+def jwk_thumbprint(public_key_jwk: dict) -> str:
+    """
+    Oblicza thumbprint klucza RSA wg RFC 7638:
+    SHA-256 z kanonicznego JSON-a {e, kty, n}, zakodowany base64url.
+    """
+    canonical = json.dumps(
+        {
+            'e': public_key_jwk['e'],
+            'kty': public_key_jwk.get('kty', 'RSA'),
+            'n': public_key_jwk['n']
+        },
+        separators=(',', ':'),
+        sort_keys=True
+    )
+    digest = hashlib.sha256(canonical.encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def load_public_key(public_key_jwk: dict):
+    """Zwraca obiekt klucza RSA dla JWK (z cache po thumbprincie)"""
+    thumbprint = jwk_thumbprint(public_key_jwk)
+    public_key = _public_key_cache.get(thumbprint)
+    if public_key is None:
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.hazmat.backends import default_backend
+        
+        n = _base64url_to_int(public_key_jwk['n'])
+        e = _base64url_to_int(public_key_jwk['e'])
+        public_key = rsa.RSAPublicNumbers(e, n).public_key(default_backend())
+        _public_key_cache.set(thumbprint, public_key)
+    return public_key
+
+
+def get_public_key_cache_stats() -> dict:
+    """Liczniki cache kluczy publicznych"""
+    return _public_key_cache.stats()
+
 
 def calculate_pdf_content_hash(pdf_content: bytes) -> bytes:
     """
     Oblicza hash ZAWARTOŚCI PDF (stron) bez metadanych.
     Używane zarówno przy podpisywaniu jak i weryfikacji.
     """
+    from PyPDF2 import PdfReader, PdfWriter
+    
     try:
         pdf_reader = PdfReader(io.BytesIO(pdf_content))
         writer = PdfWriter()
@@ -34,13 +91,20 @@ def calculate_pdf_content_hash(pdf_content: bytes) -> bytes:
         return hashlib.sha256(pdf_content).digest()
 
 
-def verify_pdf_signature(pdf_content: bytes, public_key_jwk: dict) -> dict:
+def _verify_pdf_signature_uncached(pdf_content: bytes, public_key_jwk: dict) -> tuple:
     """
     Weryfikuje podpis cyfrowy PDF.
     Sprawdza:
     1. Czy zawartość PDF (strony) nie została zmodyfikowana
     2. Czy podpis kryptograficzny jest prawidłowy
+    
+    Zwraca (wynik, podpis base64 z PDF lub None jeśli nie udało się go odczytać).
     """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from PyPDF2 import PdfReader
+    
+    signature_base64 = None
     try:
         # 1. Wczytaj PDF i wyciągnij metadane
         pdf_reader = PdfReader(io.BytesIO(pdf_content))
@@ -49,7 +113,7 @@ def verify_pdf_signature(pdf_content: bytes, public_key_jwk: dict) -> dict:
             return {
                 'valid': False, 
                 'error': 'Brak podpisu w PDF - dokument nie został podpisany'
-            }
+            }, signature_base64
         
         # 2. Parsuj metadane podpisu
         signature_metadata = json.loads(pdf_reader.metadata['/Signature'])
@@ -72,21 +136,10 @@ def verify_pdf_signature(pdf_content: bytes, public_key_jwk: dict) -> dict:
             return {
                 'valid': False,
                 'error': '⚠️ DOKUMENT ZOSTAŁ ZMODYFIKOWANY! Zawartość nie zgadza się z podpisem.'
-            }
-        
-        # 6. Konwertuj JWK na klucz publiczny RSA
-        def base64url_to_int(data: str) -> int:
-            padding_needed = 4 - (len(data) % 4)
-            if padding_needed and padding_needed != 4:
-                data += '=' * padding_needed
-            data = data.replace('-', '+').replace('_', '/')
-            return int.from_bytes(base64.b64decode(data), byteorder='big')
-        
-        n = base64url_to_int(public_key_jwk['n'])
-        e = base64url_to_int(public_key_jwk['e'])
+            }, signature_base64
         
-        public_numbers = rsa.RSAPublicNumbers(e, n)
-        public_key = public_numbers.public_key(default_backend())
+        # 6. Konwertuj JWK na klucz publiczny RSA (z cache)
+        public_key = load_public_key(public_key_jwk)
         
         # 7. Weryfikuj podpis kryptograficzny
         try:
@@ -104,28 +157,63 @@ def verify_pdf_signature(pdf_content: bytes, public_key_jwk: dict) -> dict:
                 'valid': True,
                 'message': '✅ Podpis jest prawidłowy! Dokument jest autentyczny i nie został zmodyfikowany.',
                 'metadata': metadata
-            }
+            }, signature_base64
             
         except Exception as verify_error:
             print(f"❌ Błąd weryfikacji podpisu RSA: {verify_error}")
             return {
                 'valid': False,
                 'error': f'❌ Podpis kryptograficzny nieprawidłowy - dokument mógł zostać zmodyfikowany'
-            }
+            }, signature_base64
             
     except KeyError as e:
         return {
             'valid': False, 
             'error': f'Nieprawidłowa struktura podpisu: brak klucza {str(e)}'
-        }
+        }, signature_base64
     except json.JSONDecodeError:
         return {
             'valid': False, 
             'error': 'Nieprawidłowy format metadanych podpisu'
-        }
+        }, signature_base64
     except Exception as e:
         print(f"❌ Błąd weryfikacji: {e}")
         return {
             'valid': False, 
             'error': f'Błąd weryfikacji: {str(e)}'
-        }
+        }, signature_base64
+
+
+def verify_pdf_signature(pdf_content: bytes, public_key_jwk: dict) -> dict:
+    """
+    Weryfikuje podpis cyfrowy PDF z cache wyników.
+    Klucz cache: (SHA-256 surowych bajtów pliku, thumbprint klucza publicznego),
+    więc trafienie pomija parsowanie PDF.
+    """
+    try:
+        cache_key = (hashlib.sha256(pdf_content).digest(), jwk_thumbprint(public_key_jwk))
+    except (KeyError, TypeError, AttributeError):
+        cache_key = None
+    
+    if cache_key is not None:
+        cached = _verification_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+    
+    result, signature_base64 = _verify_pdf_signature_uncached(pdf_content, public_key_jwk)
+    
+    # Cache'ujemy tylko wyniki dla odczytanego podpisu - tag pozwala je unieważnić
+    if cache_key is not None and signature_base64:
+        _verification_cache.set(cache_key, copy.deepcopy(result), tags=(signature_base64,))
+    
+    return result
+
+
+def invalidate_verification_cache(signature_data: str) -> int:
+    """Usuwa z cache wyniki weryfikacji dotyczące danego podpisu"""
+    return _verification_cache.invalidate_tag(signature_data)
+
+
+def get_verification_cache_stats() -> dict:
+    """Liczniki cache wyników weryfikacji"""
+    return _verification_cache.stats()
@@ -0,0 +1,278 @@
+"""
+Sprzątanie dysku: porzucone pliki z prepare, stare eksporty kluczy
+i pliki w signed_pdfs niezgodne z bazą.
+
+Sprzątanie działa cyklicznie w tle (GC_INTERVAL_SECONDS) albo na żądanie
+admina. W trybie dry_run tylko raportuje, co zostałoby usunięte.
+Pliki młodsze niż GC_GRACE_SECONDS są zawsze pomijane.
+Osierocone podpisane PDF-y nigdy nie są usuwane - trafiają do kwarantanny,
+i to tylko gdy bezpiecznik nie wskazuje na niezgodną bazę.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from .. import config
+from ..database import SessionLocal, Signature
+from .archive_service import HOT_TIER
+
+# Prefiks folderów tworzonych przez prepare w STAGING_DIR
+STAGING_PREFIX = "prepare_"
+
+# Pozostałości starszych wersji w katalogu tymczasowym systemu (mkdtemp)
+_LEGACY_TMP_DIR = re.compile(r"^tmp[a-z0-9_]{8}$")
+_LEGACY_PREPARE_FILE = re.compile(r"^(orig|temp)_\d{8}_\d{6}_\d{6}_.*$")
+_LEGACY_KEY_FILE = re.compile(r"^public_key_.*\.json$")
+
+_lock = threading.Lock()
+_stop = threading.Event()
+last_report = None
+
+
+def _size(path: str) -> int:
+    """Rozmiar pliku lub folderu (rekurencyjnie) w bajtach"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _age(path: str, now: float) -> float:
+    return now - os.path.getmtime(path)
+
+
+def _remove(path: str, dry_run: bool) -> bool:
+    if dry_run:
+        return True
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"⚠️ GC: nie udało się usunąć {path}: {e}")
+        return False
+
+
+def _new_section() -> dict:
+    return {"removed": 0, "bytes": 0, "paths": []}
+
+
+def _reclaim(section: dict, path: str, size: int, dry_run: bool):
+    if _remove(path, dry_run):
+        section["removed"] += 1
+        section["bytes"] += size
+        section["paths"].append(path)
+
+
+def _quarantine(section: dict, path: str, size: int, dry_run: bool):
+    """Przenosi plik do GC_QUARANTINE_DIR (nazwy podpisanych plików są unikalne)"""
+    if not dry_run:
+        config.GC_QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+        target = os.path.join(config.GC_QUARANTINE_DIR, os.path.basename(path))
+        if os.path.exists(target):
+            target += f".{int(time.time())}"
+        try:
+            shutil.move(path, target)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"⚠️ GC: nie udało się przenieść {path} do kwarantanny: {e}")
+            return
+    section["removed"] += 1
+    section["bytes"] += size
+    section["paths"].append(path)
+
+
+def _sweep_staging(now: float, dry_run: bool) -> dict:
+    """Foldery prepare: starsze niż limit wieku, potem najstarsze ponad budżet"""
+    section = _new_section()
+    if not config.STAGING_DIR.is_dir():
+        return section
+
+    entries = []
+    for entry in os.scandir(config.STAGING_DIR):
+        if entry.name.startswith(STAGING_PREFIX) and entry.is_dir(follow_symlinks=False):
+            entries.append((_age(entry.path, now), entry.path, _size(entry.path)))
+
+    # Od najstarszych
+    entries.sort(reverse=True)
+    total = sum(size for _, _, size in entries)
+    for age, path, size in entries:
+        if age < config.GC_GRACE_SECONDS:
+            continue
+        if age > config.GC_STAGING_MAX_AGE or total > config.GC_STAGING_MAX_BYTES:
+            _reclaim(section, path, size, dry_run)
+            total -= size
+    return section
+
+
+def _sweep_legacy_tmp(now: float, dry_run: bool) -> dict:
+    """
+    Foldery mkdtemp w katalogu tymczasowym systemu zostawione przez starsze
+    wersje (prepare, eksport klucza). Usuwane tylko gdy zawierają wyłącznie
+    rozpoznane pliki i są starsze niż limit wieku.
+    """
+    section = _new_section()
+    tmp_root = tempfile.gettempdir()
+    for entry in os.scandir(tmp_root):
+        if not _LEGACY_TMP_DIR.match(entry.name) or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            names = os.listdir(entry.path)
+            if _age(entry.path, now) < config.GC_STAGING_MAX_AGE:
+                continue
+        except OSError:
+            continue
+        is_prepare = names and all(_LEGACY_PREPARE_FILE.match(name) for name in names)
+        is_key_export = len(names) == 1 and _LEGACY_KEY_FILE.match(names[0])
+        if is_prepare or is_key_export:
+            _reclaim(section, entry.path, _size(entry.path), dry_run)
+    return section
+
+
+def _sweep_signed_pdfs(now: float, dry_run: bool, force: bool = False) -> tuple:
+    """
+    Uzgadnia signed_pdfs z Signature.signed_pdf_path w obie strony:
+    przenosi do kwarantanny pliki bez rekordu, raportuje rekordy bez pliku.
+    Plik jest rozpoznawany po pełnej ścieżce albo po nazwie (ścieżki względne
+    w bazie mogły powstać przy innym katalogu roboczym).
+    """
+    orphans = _new_section()
+    orphans["quarantine_dir"] = str(config.GC_QUARANTINE_DIR)
+    orphans["refused"] = None
+    missing = {"count": 0, "ids": []}
+
+    db = SessionLocal()
+    try:
+        # Zarchiwizowane podpisy nie mają pliku w signed_pdfs (są w paczkach archiwum)
+        rows = (
+            db.query(Signature.id, Signature.signed_pdf_path)
+            .filter(Signature.storage_tier == HOT_TIER)
+            .all()
+        )
+    finally:
+        db.close()
+
+    known = set()
+    known_names = set()
+    for signature_id, path in rows:
+        if not path:
+            continue
+        real_path = os.path.realpath(path)
+        known.add(real_path)
+        known_names.add(os.path.basename(path))
+        in_signed_dir = os.path.join(config.SIGNED_PDF_DIR, os.path.basename(path))
+        if not os.path.exists(real_path) and not os.path.exists(in_signed_dir):
+            missing["count"] += 1
+            missing["ids"].append(signature_id)
+
+    if not config.SIGNED_PDF_DIR.is_dir():
+        return orphans, missing
+
+    files = 0
+    candidates = []
+    for entry in os.scandir(config.SIGNED_PDF_DIR):
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        files += 1
+        if os.path.realpath(entry.path) in known or entry.name in known_names:
+            continue
+        # Świeży plik może czekać na commit w embed
+        if _age(entry.path, now) < config.GC_GRACE_SECONDS:
+            continue
+        candidates.append((entry.path, entry.stat().st_size))
+
+    # Bezpiecznik: tyle "osieroconych" plików to raczej zła baza niż śmieci
+    if candidates and not force:
+        if not known:
+            orphans["refused"] = "Baza nie wskazuje żadnego pliku w warstwie hot"
+        elif len(candidates) > config.GC_ORPHAN_MAX_FRACTION * files:
+            orphans["refused"] = (
+                f"Bez rekordu {len(candidates)} z {files} plików "
+                f"(limit {config.GC_ORPHAN_MAX_FRACTION:.0%})"
+            )
+        if orphans["refused"]:
+            orphans["candidates"] = len(candidates)
+            print(f"🛑 GC: pominięto osierocone podpisane PDF-y - {orphans['refused']}")
+            return orphans, missing
+
+    for path, size in candidates:
+        _quarantine(orphans, path, size, dry_run)
+    return orphans, missing
+
+
+def sweep(dry_run: bool = False, orphans_dry_run: bool = None, force: bool = False) -> dict:
+    """
+    Jeden przebieg sprzątania; zwraca raport (liczby i odzyskane bajty).
+    orphans_dry_run - osobno dla osieroconych podpisanych PDF-ów (domyślnie jak dry_run);
+    force - pomija bezpiecznik dla osieroconych plików.
+    """
+    global last_report
+
+    with _lock:
+        started = time.perf_counter()
+        now = time.time()
+
+        staging = _sweep_staging(now, dry_run)
+        legacy = _sweep_legacy_tmp(now, dry_run)
+        orphans, missing = _sweep_signed_pdfs(
+            now, dry_run if orphans_dry_run is None else orphans_dry_run, force
+        )
+
+        report = {
+            "dry_run": dry_run,
+            "started_at": datetime.utcnow().isoformat(),
+            "duration_seconds": round(time.perf_counter() - started, 4),
+            "reclaimed_bytes": staging["bytes"] + legacy["bytes"],
+            "staging": staging,
+            "legacy_tmp": legacy,
+            "orphaned_signed_pdfs": orphans,
+            "missing_signed_pdfs": missing
+        }
+
+    action = "do odzyskania" if dry_run else "odzyskano"
+    print(
+        f"🧹 GC: {action} {report['reclaimed_bytes']} B "
+        f"(staging {staging['removed']}, tmp {legacy['removed']}), "
+        f"signed_pdfs do kwarantanny: {orphans['removed']}, "
+        f"brakujących plików: {missing['count']}"
+    )
+    if not dry_run:
+        last_report = report
+    return report
+
+
+def _run_periodically():
+    while not _stop.wait(config.GC_INTERVAL_SECONDS):
+        try:
+            # Osierocone podpisane PDF-y w tle tylko raportowane, chyba że włączone jawnie
+            sweep(orphans_dry_run=not config.GC_SCHEDULED_ORPHANS)
+        except Exception as e:
+            print(f"❌ GC nieudany: {e}")
+
+
+def start():
+    """Uruchamia cykliczne sprzątanie w tle (gdy GC_INTERVAL_SECONDS > 0)"""
+    if config.GC_INTERVAL_SECONDS <= 0:
+        return
+    _stop.clear()
+    threading.Thread(target=_run_periodically, name="disk-gc", daemon=True).start()
+
+
+def stop():
+    _stop.set()
@@ -0,0 +1,123 @@
+"""
+Broadcast zdarzeń rejestru podpisów do podłączonych dashboardów (SSE).
+
+Każdy subskrybent ma ograniczony bufor. Gdy klient nie nadąża i bufor
+się zapełni, jest odłączany (dostaje zdarzenie "dropped" i powinien
+przeładować listę), zamiast spowalniać publikowanie dla pozostałych.
+"""
+
+import asyncio
+import itertools
+import json
+
+from .. import config
+
+# Znacznik końca strumienia dla odłączonego (zbyt wolnego) klienta
+DROPPED = object()
+
+
+class Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue = asyncio.Queue(maxsize=buffer_size + 1)  # +1 na znacznik DROPPED
+        self.buffer_size = buffer_size
+        self.dropped = False
+
+
+class EventHub:
+    """Hub publish/subscribe działający w pętli zdarzeń procesu"""
+
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._loop = None
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data: dict):
+        """Publikuje zdarzenie; bezpieczne także z wątków spoza pętli zdarzeń"""
+        if self._loop is None or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._publish(event_type, data)
+        else:
+            self._loop.call_soon_threadsafe(self._publish, event_type, data)
+
+    def _publish(self, event_type: str, data: dict):
+        event = {"id": next(self._ids), "type": event_type, "data": data}
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if subscriber.queue.qsize() >= subscriber.buffer_size:
+                self._drop(subscriber)
+            else:
+                subscriber.queue.put_nowait(event)
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.dropped = True
+        self._subscribers.discard(subscriber)
+        self.dropped_subscribers += 1
+        subscriber.queue.put_nowait(DROPPED)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+hub = EventHub(config.EVENT_BUFFER_SIZE)
+
+
+def format_sse(event: dict) -> str:
+    """Formatuje zdarzenie w formacie text/event-stream"""
+    payload = json.dumps(event["data"], ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+async def stream_events():
+    """Generator SSE dla jednego klienta (keepalive co EVENT_KEEPALIVE_SECONDS)"""
+    subscriber = hub.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=config.EVENT_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is DROPPED:
+                yield "event: dropped\ndata: {}\n\n"
+                break
+            yield format_sse(event)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def signature_event_data(signature) -> dict:
+    """Dane podpisu w zdarzeniu - ten sam kształt co wpis w /admin/documents"""
+    return {
+        "id": signature.id,
+        "filename": signature.original_filename,
+        "signer": signature.signer_name,
+        "username": signature.signer.username,
+        "signed_at": signature.created_at.isoformat(),
+        "location": signature.signer_location,
+        "reason": signature.signer_reason
+    }
@@ -0,0 +1,154 @@
+"""
+Strumieniowy eksport rejestru podpisów (NDJSON / CSV, opcjonalnie gzip).
+
+Wiersze są czytane stronami po EXPORT_BATCH_SIZE (keyset: created_at + id),
+każda strona w osobnej krótkiej transakcji, i od razu wysyłane klientowi.
+Zużycie pamięci nie zależy od liczby rekordów, a wolny klient nie trzyma
+blokady odczytu SQLite przez cały eksport (zapisy nie dostają
+"database is locked"). Eksport można wznowić od kursora.
+"""
+
+import base64
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select, or_, and_
+
+from .. import config
+from ..database import ReadSessionLocal, Signature, User
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = [
+    "id",
+    "username",
+    "signer_name",
+    "signer_location",
+    "signer_reason",
+    "signer_contact",
+    "original_filename",
+    "file_hash",
+    "signature_data",
+    "public_key_thumbprint",
+    "file_size",
+    "created_at",
+    "cursor",
+]
+
+
+def encode_cursor(created_at: datetime, signature_id: str) -> str:
+    """Kursor wznowienia: pozycja rekordu w kolejności (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{signature_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Odwrotność encode_cursor; ValueError dla niepoprawnego kursora"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, signature_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), signature_id
+    except Exception:
+        raise ValueError("Nieprawidłowy kursor")
+
+
+def _export_query(after: tuple = None):
+    query = (
+        select(
+            Signature.id,
+            User.username,
+            Signature.signer_name,
+            Signature.signer_location,
+            Signature.signer_reason,
+            Signature.signer_contact,
+            Signature.original_filename,
+            Signature.file_hash,
+            Signature.signature_data,
+            Signature.public_key_thumbprint,
+            Signature.file_size,
+            Signature.created_at,
+        )
+        .join(User, Signature.user_id == User.id)
+        .order_by(Signature.created_at, Signature.id)
+    )
+    if after is not None:
+        created_at, signature_id = after
+        query = query.where(or_(
+            Signature.created_at > created_at,
+            and_(Signature.created_at == created_at, Signature.id > signature_id)
+        ))
+    return query
+
+
+def _iter_rows(after: tuple = None):
+    """Kolejne strony eksportu; sesja jest zamykana przed oddaniem wierszy"""
+    while True:
+        db = ReadSessionLocal()
+        try:
+            rows = db.execute(_export_query(after).limit(config.EXPORT_BATCH_SIZE)).all()
+        finally:
+            db.close()
+        yield from rows
+        if len(rows) < config.EXPORT_BATCH_SIZE:
+            return
+        after = (rows[-1].created_at, rows[-1].id)
+
+
+def _row_values(row) -> dict:
+    values = dict(row._mapping)
+    values["cursor"] = encode_cursor(row.created_at, row.id)
+    values["created_at"] = row.created_at.isoformat()
+    return values
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(_row_values(row), ensure_ascii=False) + "\n"
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(_row_values(row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # nagłówek przy pustym eksporcie
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_export(export_format: str = "ndjson", compress: bool = False, after: tuple = None):
+    """
+    Generator kawałków eksportu (bytes). Strony czytane własnymi sesjami -
+    niezależnie od cyklu życia żądania.
+    """
+    rows = _iter_rows(after)
+    lines = _csv_lines(rows) if export_format == "csv" else _ndjson_lines(rows)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    chunk = []
+    chunk_size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        chunk.append(data)
+        chunk_size += len(data)
+        if chunk_size >= config.EXPORT_CHUNK_BYTES:
+            payload = b"".join(chunk)
+            yield compressor.compress(payload) if compressor else payload
+            chunk = []
+            chunk_size = 0
+
+    payload = b"".join(chunk)
+    if compressor:
+        yield compressor.compress(payload) + compressor.flush()
+    elif payload:
+        yield payload
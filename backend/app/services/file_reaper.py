@@ -0,0 +1,92 @@
+"""
+Usuwanie plików podpisanych PDF-ów w tle.
+
+Endpointy usuwające podpisy tylko zlecają usunięcie plików i od razu
+odpowiadają. Wątek reapera usuwa pliki, a nieudane próby (np. plik
+chwilowo zablokowany) powtarza z rosnącym opóźnieniem.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from .. import config
+
+
+class FileReaper:
+    """Kolejka plików do usunięcia obsługiwana przez jeden wątek w tle"""
+
+    def __init__(self, max_attempts: int, retry_delay: float):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._heap = []  # (kiedy, kolejność, ścieżka, próba)
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self.removed = 0
+        self.missing = 0
+        self.retries = 0
+        self.failed = 0
+
+    def submit(self, paths):
+        """Zleca usunięcie plików (puste ścieżki są pomijane)"""
+        now = time.monotonic()
+        with self._condition:
+            for path in paths:
+                if path:
+                    heapq.heappush(self._heap, (now, next(self._order), path, 1))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="file-reaper", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                _, _, path, attempt = heapq.heappop(self._heap)
+            self._remove(path, attempt)
+
+    def _remove(self, path: str, attempt: int):
+        try:
+            os.remove(path)
+            self.removed += 1
+        except FileNotFoundError:
+            self.missing += 1
+        except OSError as e:
+            if attempt >= self.max_attempts:
+                self.failed += 1
+                print(f"❌ Nie udało się usunąć pliku {path} po {attempt} próbach: {e}")
+                return
+            self.retries += 1
+            delay = self.retry_delay * 2 ** (attempt - 1)
+            print(f"⚠️ Błąd usuwania pliku {path} (próba {attempt}): {e}, ponowienie za {delay}s")
+            with self._condition:
+                heapq.heappush(
+                    self._heap,
+                    (time.monotonic() + delay, next(self._order), path, attempt + 1)
+                )
+                self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "removed": self.removed,
+            "missing": self.missing,
+            "retries": self.retries,
+            "failed": self.failed
+        }
+
+
+reaper = FileReaper(config.REAPER_MAX_ATTEMPTS, config.REAPER_RETRY_DELAY)
@@ -0,0 +1,234 @@
+"""
+Listy podpisów: projekcja pól (fields=) i szybka serializacja odpowiedzi.
+
+Zapytanie pobiera tylko kolumny potrzebne do żądanych pól (bez ładowania
+całych obiektów ORM), a odpowiedź jest serializowana bezpośrednio przez
+pydantic-core (Rust), z pominięciem pól, których klient nie zażądał.
+
+Odpowiedzi mają ETag = wersja rejestru: If-None-Match daje 304 bez
+zapytania do signatures, a zserializowane strony są trzymane w cache
+pod kluczem (wersja, ścieżka, parametry obsługiwane przez endpoint).
+Cache ma limit bajtów i trzyma tylko strony aktualnej wersji - nowa
+wersja rejestru czyści strony poprzednich.
+"""
+
+import base64
+import threading
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import func
+
+from .. import config
+from ..database import Signature, User
+from . import registry_service
+from .cache_service import LRUCache
+
+# Zserializowane odpowiedzi list (tylko wersja _cache_etag)
+page_cache = LRUCache(config.LISTING_CACHE_SIZE, max_bytes=config.LISTING_CACHE_MAX_BYTES)
+_cache_etag = None
+_cache_etag_lock = threading.Lock()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializowana przez pydantic-core (pomija nieustawione pola modeli)"""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, exclude_unset=True)
+        return to_json(content)
+
+
+# ===== MODELE ODPOWIEDZI =====
+
+class DocumentItem(BaseModel):
+    id: Optional[str] = None
+    filename: Optional[str] = None
+    signer: Optional[str] = None
+    username: Optional[str] = None
+    signed_at: Optional[str] = None
+    location: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class SignedPdfListResponse(BaseModel):
+    success: bool
+    count: int
+    documents: List[DocumentItem]
+
+
+class AdminDocumentListResponse(BaseModel):
+    total: int
+    users: Dict[str, List[DocumentItem]]
+    documents: List[DocumentItem]
+
+
+class SignatureRecord(BaseModel):
+    id: Optional[str] = None
+    file_hash: Optional[str] = None
+    signature_preview: Optional[str] = None
+    signer_name: Optional[str] = None
+    signer_location: Optional[str] = None
+    signer_reason: Optional[str] = None
+    signer_contact: Optional[str] = None
+    original_filename: Optional[str] = None
+    created_at: Optional[str] = None
+    created_at_formatted: Optional[str] = None
+    username: Optional[str] = None
+
+
+class SignatureListResponse(BaseModel):
+    total_count: int
+    records: List[SignatureRecord]
+
+
+# ===== PROJEKCJA =====
+
+class Field:
+    """Pole odpowiedzi: potrzebne kolumny SQL i funkcja budująca wartość"""
+
+    def __init__(self, *columns, build=None):
+        self.columns = columns
+        self.build = build or (lambda value: value)
+
+
+def _preview(raw_prefix, raw_length) -> str:
+    """Pierwsze 32 znaki Base64 (+ '...'), liczone z 24 bajtów zamiast całej wartości"""
+    encoded = base64.b64encode(raw_prefix or b"").decode("utf-8")
+    return encoded[:32] + "..." if raw_length > 24 else encoded
+
+
+def _or_missing(value):
+    return value or "Brak"
+
+
+DOCUMENT_FIELDS = {
+    "id": Field(Signature.id),
+    "filename": Field(Signature.original_filename),
+    "signer": Field(Signature.signer_name),
+    "username": Field(User.username),
+    "signed_at": Field(Signature.created_at, build=lambda value: value.isoformat()),
+    "location": Field(Signature.signer_location),
+    "reason": Field(Signature.signer_reason),
+}
+
+SIGNATURE_RECORD_FIELDS = {
+    "id": Field(Signature.id),
+    "file_hash": Field(
+        Signature.file_hash,
+        build=lambda value: value[:32] + "..." if len(value) > 32 else value
+    ),
+    "signature_preview": Field(
+        func.substr(Signature.signature_data, 1, 24),
+        func.length(Signature.signature_data),
+        build=_preview
+    ),
+    "signer_name": Field(Signature.signer_name, build=_or_missing),
+    "signer_location": Field(Signature.signer_location, build=_or_missing),
+    "signer_reason": Field(Signature.signer_reason, build=_or_missing),
+    "signer_contact": Field(Signature.signer_contact, build=_or_missing),
+    "original_filename": Field(Signature.original_filename, build=_or_missing),
+    "created_at": Field(Signature.created_at, build=lambda value: value.isoformat()),
+    "created_at_formatted": Field(
+        Signature.created_at,
+        build=lambda value: value.strftime("%Y-%m-%d %H:%M:%S")
+    ),
+    "username": Field(User.username),
+}
+
+
+def parse_fields(fields: Optional[str], spec: dict) -> list:
+    """Parsuje parametr fields=a,b,c; bez parametru - wszystkie pola"""
+    if not fields:
+        return list(spec)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in spec]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nieznane pola: {', '.join(unknown)}. Dostępne: {', '.join(spec)}"
+        )
+    return requested
+
+
+def query_projection(db, spec: dict, field_names: list, extra_columns: dict = None):
+    """
+    Buduje zapytanie ładujące tylko kolumny potrzebne do field_names
+    (+ extra_columns: nazwa -> kolumna, np. do grupowania). Join z users tylko gdy potrzebny.
+    """
+    columns = []
+    needs_user = False
+    for name in field_names:
+        for index, column in enumerate(spec[name].columns):
+            columns.append(column.label(f"{name}__{index}"))
+            needs_user = needs_user or getattr(column, "class_", None) is User
+    for name, column in (extra_columns or {}).items():
+        columns.append(column.label(name))
+        needs_user = needs_user or getattr(column, "class_", None) is User
+
+    query = db.query(*columns).select_from(Signature)
+    if needs_user:
+        query = query.join(User, Signature.user_id == User.id)
+    return query
+
+
+def build_items(rows, spec: dict, field_names: list, model) -> list:
+    """Zamienia wiersze projekcji na modele (ustawione tylko żądane pola)"""
+    items = []
+    for row in rows:
+        mapping = row._mapping
+        values = {}
+        for name in field_names:
+            field = spec[name]
+            args = [mapping[f"{name}__{index}"] for index in range(len(field.columns))]
+            values[name] = field.build(*args)
+        items.append(model.model_construct(**values))
+    return items
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _use_version(etag: str):
+    """Przełącza cache na wersję etag - strony innych wersji nie będą już trafione"""
+    global _cache_etag
+    with _cache_etag_lock:
+        if etag != _cache_etag:
+            page_cache.clear()
+            _cache_etag = etag
+
+
+def cached_listing(request: Request, db, build, params: tuple = ()) -> Response:
+    """
+    Odpowiedź listy z ETagiem wersji rejestru. build() buduje model
+    odpowiedzi - wywoływane tylko, gdy strony nie ma w cache.
+    params - znormalizowane parametry, od których zależy treść (np. lista pól);
+    inne parametry w URL nie tworzą nowych wpisów.
+    """
+    # Wersja przed danymi: dane mogą być nowsze niż ETag, nigdy starsze
+    etag = registry_service.get_etag(db)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    _use_version(etag)
+    key = (etag, request.url.path, params)
+    body = page_cache.get(key)
+    if body is None:
+        body = FastJSONResponse(build()).body
+        # Strona wersji, którą w międzyczasie zastąpiła nowsza, nie trafia do cache
+        with _cache_etag_lock:
+            if etag == _cache_etag:
+                page_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def get_page_cache_stats() -> dict:
+    return page_cache.stats()
@@ -1,9 +1,302 @@
+import hashlib
+import io
 import json
-from PyPDF2 import PdfReader, PdfWriter
+import threading
 from datetime import datetime
 
+# Klucze z odwołaniami "w górę" drzewa - pomijane przy przechodzeniu obiektów
+_BACK_REFERENCE_KEYS = {"/Parent", "/P"}
+
+# Operatory strumienia treści odwołujące się do zasobów strony
+_RESOURCE_OPERATORS = {b"Do": "/XObject", b"Tf": "/Font"}
+
+# Sumaryczne wyniki optymalizacji (do oceny oszczędności na naszych dokumentach)
+optimization_stats = {
+    "documents": 0,
+    "bytes_before": 0,
+    "bytes_after": 0,
+    "deduplicated_objects": 0,
+    "pruned_resources": 0
+}
+_stats_lock = threading.Lock()
+
+
+def _inherited_resources(obj, resources):
+    """/Resources strumienia albo (gdy ich nie ma) zasoby miejsca, z którego jest użyty"""
+    own = obj.get("/Resources")
+    return resources if own is None else own.get_object()
+
+
+def _resource_entries(resources, category: str) -> dict:
+    entries = resources.get(category)
+    return {} if entries is None else entries.get_object()
+
+
+def _appearance_streams(page):
+    """Strumienie wyglądu adnotacji (/AP: /N, /R, /D - strumień albo słownik stanów)"""
+    from PyPDF2.generic import StreamObject
+
+    annotations = page.get("/Annots")
+    for annotation in [] if annotations is None else annotations.get_object():
+        appearance = annotation.get_object().get("/AP")
+        if appearance is None:
+            continue
+        for value in appearance.get_object().values():
+            value = value.get_object()
+            if isinstance(value, StreamObject):
+                yield value
+            else:
+                for state in value.values():
+                    yield state.get_object()
+
+
+def _nested_streams(resources):
+    """
+    Strumienie treści zagnieżdżone w zasobach: wzorce kafelkowe (/Pattern)
+    i grupy miękkich masek (/ExtGState /SMask /G). Cieniowania (/Shading)
+    nie mają strumienia treści ani nazw zasobów.
+    """
+    for pattern in _resource_entries(resources, "/Pattern").values():
+        pattern = pattern.get_object()
+        if pattern.get("/PatternType") == 1:
+            yield pattern
+    for state in _resource_entries(resources, "/ExtGState").values():
+        soft_mask = state.get_object().get("/SMask")
+        if soft_mask is None or soft_mask.get_object() == "/None":
+            continue
+        group = soft_mask.get_object().get("/G")
+        if group is not None:
+            yield group.get_object()
+
+
+def _collect_used_resources(stream, resources, pdf, shared, visited):
+    """
+    Zbiera nazwy zasobów (/XObject, /Font) użyte w strumieniu treści i -
+    rekurencyjnie - w formularzach, fontach Type3, wzorcach i maskach, które
+    z niego wynikają. Strumień bez własnych /Resources korzysta z zasobów
+    wywołującego, więc jego nazwy liczą się jako użycia tych zasobów.
+    """
+    from PyPDF2.generic import ContentStream
+
+    key = (id(stream), id(resources))
+    if resources is None or key in visited:
+        return
+    visited[key] = stream  # referencja trzyma id() ważne do końca
+
+    states = {}
+    for category in _RESOURCE_OPERATORS.values():
+        if category in resources:
+            entries = resources[category].get_object()
+            states[category] = shared.setdefault(id(entries), [entries, set()])
+
+    try:
+        if stream is None:
+            operations = []
+        elif isinstance(stream, ContentStream):
+            operations = stream.operations
+        else:
+            operations = ContentStream(stream, pdf).operations
+    except Exception:
+        # Nieczytelna treść - nie wiemy, których nazw używa
+        for state in states.values():
+            state[1] = None
+        operations = []
+
+    for operands, operator in operations:
+        state = states.get(_RESOURCE_OPERATORS.get(operator))
+        if state is None or not operands:
+            continue
+        if state[1] is not None:
+            state[1].add(operands[0])
+        target = state[0].get(operands[0])
+        if target is None:
+            continue
+        target = target.get_object()
+        if operator == b"Do" and target.get("/Subtype") == "/Form":
+            _collect_used_resources(
+                target, _inherited_resources(target, resources), pdf, shared, visited
+            )
+        elif operator == b"Tf" and target.get("/Subtype") == "/Type3":
+            for char_proc in target["/CharProcs"].get_object().values():
+                _collect_used_resources(
+                    char_proc.get_object(), _inherited_resources(target, resources), pdf, shared, visited
+                )
+
+    for nested in _nested_streams(resources):
+        _collect_used_resources(nested, _inherited_resources(nested, resources), pdf, shared, visited)
+
+
+def _prune_unused_resources(pages) -> int:
+    """
+    Usuwa z /Resources stron obrazy/formularze i fonty, do których nie
+    odwołuje się żadna treść: strony, wywoływanych formularzy (także bez
+    własnych /Resources), wzorców i wyglądów adnotacji. Słowniki zasobów
+    współdzielone są czyszczone dopiero po zebraniu nazw ze wszystkich miejsc.
+    Czyszczone są tylko zasoby stron - zagnieżdżone jedynie dostarczają użyć.
+    """
+    shared = {}  # id(słownik) -> [słownik, użyte nazwy albo None gdy nieznane]
+    visited = {}
+    page_entries = set()
+    for page in pages:
+        resources = page.get("/Resources")
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        for category in _RESOURCE_OPERATORS.values():
+            if category in resources:
+                page_entries.add(id(resources[category].get_object()))
+        try:
+            content = page.get_contents()
+            _collect_used_resources(content, resources, page.pdf, shared, visited)
+            for appearance in _appearance_streams(page):
+                _collect_used_resources(
+                    appearance, _inherited_resources(appearance, resources), page.pdf, shared, visited
+                )
+        except Exception:
+            for category in _RESOURCE_OPERATORS.values():
+                if category in resources:
+                    entries = resources[category].get_object()
+                    shared.setdefault(id(entries), [entries, None])[1] = None
+
+    pruned = 0
+    for entries_id, (entries, used) in shared.items():
+        if used is None or entries_id not in page_entries:
+            continue
+        for name in [name for name in entries if name not in used]:
+            del entries[name]
+            pruned += 1
+    return pruned
+
+
+def _rewrite_references(obj, mapping: dict):
+    """Podmienia odwołania do duplikatów (w obiekcie i jego bezpośrednich kontenerach)"""
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    if isinstance(obj, DictionaryObject):
+        items = list(obj.items())
+    elif isinstance(obj, ArrayObject):
+        items = list(enumerate(obj))
+    else:
+        return
+    for key, value in items:
+        if isinstance(value, IndirectObject):
+            replacement = mapping.get((value.idnum, value.generation))
+            if replacement is not None:
+                obj[key] = replacement
+        elif key not in _BACK_REFERENCE_KEYS:
+            _rewrite_references(value, mapping)
+
+
+def _deduplicate_objects(pages) -> int:
+    """
+    Scala identyczne obiekty pośrednie (np. ten sam font lub obraz osadzony
+    osobno na każdej stronie). Obiekty są porównywane od liści w górę, więc
+    po scaleniu dzieci identyczne stają się także ich rodzice.
+    """
+    from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+
+    order = []
+    seen = set()
+
+    def walk(obj):
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in seen:
+                return
+            seen.add(key)
+            target = obj.get_object()
+            walk(target)
+            order.append((obj, target))
+        elif isinstance(obj, DictionaryObject):
+            for key, value in obj.items():
+                if key not in _BACK_REFERENCE_KEYS:
+                    walk(value)
+        elif isinstance(obj, ArrayObject):
+            for value in obj:
+                walk(value)
+
+    for page in pages:
+        walk(page)
+
+    canonical = {}
+    mapping = {}
+    for reference, target in order:
+        _rewrite_references(target, mapping)
+        if isinstance(target, DictionaryObject) and target.get("/Type") == "/Page":
+            continue
+        buffer = io.BytesIO()
+        target.write_to_stream(buffer, None)
+        digest = hashlib.sha256(buffer.getvalue()).digest()
+        if digest in canonical:
+            mapping[(reference.idnum, reference.generation)] = canonical[digest]
+        else:
+            canonical[digest] = reference
+
+    for page in pages:
+        _rewrite_references(page, mapping)
+    return len(mapping)
+
 
 class PdfService:
+    @staticmethod
+    def optimize_pdf(pdf_content: bytes) -> tuple:
+        """
+        Zmniejsza PDF przed podpisaniem: usuwa nieużywane zasoby stron,
+        kompresuje strumienie treści (FlateDecode) i scala identyczne obiekty.
+        Kopiowane są tylko strony - jak przy osadzaniu podpisu.
+        Zwraca (bajty PDF, raport); gdy wynik nie jest mniejszy - oryginał.
+        """
+        from PyPDF2 import PdfReader, PdfWriter
+        
+        report = {
+            "bytes_before": len(pdf_content),
+            "bytes_after": len(pdf_content),
+            "deduplicated_objects": 0,
+            "pruned_resources": 0,
+            "applied": False
+        }
+        
+        try:
+            reader = PdfReader(io.BytesIO(pdf_content))
+            if reader.is_encrypted:
+                return pdf_content, report
+            
+            pages = list(reader.pages)
+            pruned = _prune_unused_resources(pages)
+            for page in pages:
+                page.compress_content_streams()
+            deduplicated = _deduplicate_objects(pages)
+            
+            # Do nowego pliku trafiają tylko obiekty osiągalne ze stron
+            writer = PdfWriter()
+            for page in pages:
+                writer.add_page(page)
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            optimized = buffer.getvalue()
+        except Exception as e:
+            print(f"⚠️ Optymalizacja PDF nieudana, używam oryginału: {e}")
+            return pdf_content, report
+        
+        if len(optimized) < len(pdf_content):
+            report.update(
+                bytes_after=len(optimized),
+                deduplicated_objects=deduplicated,
+                pruned_resources=pruned,
+                applied=True
+            )
+        
+        with _stats_lock:
+            optimization_stats["documents"] += 1
+            for key in ("bytes_before", "bytes_after", "deduplicated_objects", "pruned_resources"):
+                optimization_stats[key] += report[key]
+        
+        print(
+            f"🗜️ Optymalizacja PDF: {report['bytes_before']} B -> {report['bytes_after']} B "
+            f"(scalone obiekty: {deduplicated}, usunięte zasoby: {pruned})"
+        )
+        return (optimized if report["applied"] else pdf_content), report
+    
     @staticmethod
     def embed_signature_in_pdf(
         input_pdf_path: str,
@@ -16,6 +309,8 @@ class PdfService:
         Osadza podpis cyfrowy i metadane w PDF.
         Zapisuje w /Signature: {signature, file_hash, metadata}
         """
+        from PyPDF2 import PdfReader, PdfWriter
+        
         try:
             reader = PdfReader(input_pdf_path)
             writer = PdfWriter()
@@ -0,0 +1,48 @@
+"""
+Wersja rejestru podpisów (ETag list).
+
+Licznik jest zwiększany w tej samej transakcji co dodanie / usunięcie
+podpisu, więc ta sama wersja zawsze oznacza tę samą zawartość rejestru.
+Odczyt wersji to jeden wiersz - bez dotykania tabeli signatures.
+Wiersz z nową epoką powstaje w migracji (ensure), razem z tabelą.
+"""
+
+import uuid
+
+from sqlalchemy import select, update, insert
+
+from ..database import RegistryVersion
+
+REGISTRY_NAME = "signatures"
+
+
+def ensure(conn):
+    """Tworzy wiersz wersji rejestru z nową epoką, jeśli go nie ma"""
+    table = RegistryVersion.__table__
+    exists = conn.execute(select(table.c.name).where(table.c.name == REGISTRY_NAME)).first()
+    if exists is None:
+        conn.execute(insert(table).values(name=REGISTRY_NAME, version=0))
+
+
+def bump(conn):
+    """Zwiększa wersję rejestru (Session lub Connection, przed commit)"""
+    table = RegistryVersion.__table__
+    result = conn.execute(
+        update(table)
+        .where(table.c.name == REGISTRY_NAME)
+        .values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(table).values(name=REGISTRY_NAME, version=1))
+
+
+def get_etag(conn) -> str:
+    """ETag aktualnej wersji rejestru, np. "3f9a0c1e-42" """
+    table = RegistryVersion.__table__
+    row = conn.execute(
+        select(table.c.epoch, table.c.version).where(table.c.name == REGISTRY_NAME)
+    ).first()
+    if row is None:
+        # Bez wiersza (baza sprzed migracji) - ETag jednorazowy, nigdy nie daje 304
+        return f'"{uuid.uuid4().hex}"'
+    return f'"{row.epoch}-{row.version}"'
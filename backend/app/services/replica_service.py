@@ -0,0 +1,89 @@
+"""
+Lokalna replika do odczytu: okresowa kopia głównej bazy SQLite.
+
+Do testów routingu odczytów bez prawdziwej replikacji. Kopia jest robiona
+przez backup API SQLite bezpośrednio do pliku repliki, więc otwarte
+połączenia repliki widzą nowe dane bez ponownego łączenia.
+Zapisy po ostatniej synchronizacji są widoczne na replice z opóźnieniem
+do READ_REPLICA_SYNC_SECONDS.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from .. import config
+from ..database import engine, DATABASE_URL, READ_DATABASE_URL
+
+_lock = threading.Lock()
+_stop = threading.Event()
+status = {"last_sync_at": None, "last_sync_seconds": None, "syncs": 0, "errors": 0}
+
+
+def is_enabled() -> bool:
+    """Synchronizacja działa tylko dla pary plików SQLite (baza główna -> replika)"""
+    if not config.READ_DATABASE_URL or config.READ_REPLICA_SYNC_SECONDS <= 0:
+        return False
+    primary, replica = make_url(DATABASE_URL), make_url(READ_DATABASE_URL)
+    return (
+        primary.get_backend_name() == "sqlite"
+        and replica.get_backend_name() == "sqlite"
+        and replica.database not in (None, "", ":memory:")
+        and replica.database != primary.database
+    )
+
+
+def sync():
+    """Kopiuje bazę główną do pliku repliki (spójny stan z jednej chwili)"""
+    with _lock:
+        started = time.perf_counter()
+        source = engine.raw_connection()
+        try:
+            target = sqlite3.connect(make_url(READ_DATABASE_URL).database, timeout=30)
+            try:
+                source.driver_connection.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+        status["last_sync_at"] = datetime.utcnow().isoformat()
+        status["last_sync_seconds"] = round(time.perf_counter() - started, 4)
+        status["syncs"] += 1
+
+
+def _run_periodically():
+    while not _stop.wait(config.READ_REPLICA_SYNC_SECONDS):
+        try:
+            sync()
+        except Exception as e:
+            status["errors"] += 1
+            print(f"❌ Synchronizacja repliki nieudana: {e}")
+
+
+def start():
+    """Pierwsza kopia od razu (replika musi mieć schemat), kolejne cyklicznie w tle"""
+    if not is_enabled():
+        return
+    sync()
+    print(f"🔁 Replika do odczytu: {READ_DATABASE_URL} (co {config.READ_REPLICA_SYNC_SECONDS}s)")
+    _stop.clear()
+    threading.Thread(target=_run_periodically, name="replica-sync", daemon=True).start()
+
+
+def stop():
+    _stop.set()
+
+
+def get_status() -> dict:
+    return {
+        "enabled": is_enabled(),
+        "read_database": (
+            make_url(READ_DATABASE_URL).render_as_string(hide_password=True)
+            if config.READ_DATABASE_URL else None
+        ),
+        "sync_interval_seconds": config.READ_REPLICA_SYNC_SECONDS,
+        **status
+    }
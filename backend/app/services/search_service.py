@@ -0,0 +1,106 @@
+"""
+Wyszukiwanie pełnotekstowe po metadanych podpisów (SQLite FTS5).
+
+Indeks signatures_fts jest tabelą "external content" nad signatures -
+nie duplikuje danych, a triggery utrzymują go w synchronizacji przy
+INSERT / UPDATE / DELETE.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import text, bindparam, DateTime
+
+from ..database import UUIDBytes
+
+FTS_TABLE = "signatures_fts"
+FTS_COLUMNS = [
+    "signer_name",
+    "signer_location",
+    "signer_reason",
+    "signer_contact",
+    "original_filename",
+]
+
+
+def _column_list(prefix: str = "") -> str:
+    return ", ".join(f"{prefix}{column}" for column in FTS_COLUMNS)
+
+
+def ensure_fts(conn, rebuild: bool = False):
+    """Tworzy indeks FTS5 i triggery (idempotentnie); opcjonalnie przebudowuje indeks"""
+    if conn.dialect.name != "sqlite":
+        return
+
+    columns = _column_list()
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, content='signatures', content_rowid='rowid', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON signatures BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {_column_list('new.')}); "
+        f"END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON signatures BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.rowid, {_column_list('old.')}); "
+        f"END"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON signatures BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.rowid, {_column_list('old.')}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.rowid, {_column_list('new.')}); "
+        f"END"
+    )
+    if rebuild:
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(query: str) -> str:
+    """
+    Zamienia tekst od użytkownika na bezpieczne zapytanie FTS5:
+    każde słowo jako fraza z dopasowaniem prefiksu, słowa łączone przez AND.
+    """
+    terms = [term.replace('"', '') for term in query.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+def search_signatures(
+    db,
+    query: str,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    limit: int = 20,
+    offset: int = 0,
+    sort: str = "rank"
+) -> tuple:
+    """
+    Zwraca (lista (id, rank), czy są kolejne wyniki).
+    sort="rank" - wg trafności (bm25); sort="recent" - od najnowszych, bez liczenia
+    trafności (szybkie także dla bardzo ogólnych zapytań z setkami tysięcy wyników).
+    """
+    conditions = [f"{FTS_TABLE} MATCH :match"]
+    params = {"match": build_match_query(query), "limit": limit + 1, "offset": offset}
+    binds = []
+    if date_from is not None:
+        conditions.append("s.created_at >= :date_from")
+        params["date_from"] = date_from
+        binds.append(bindparam("date_from", type_=DateTime))
+    if date_to is not None:
+        conditions.append("s.created_at < :date_to")
+        params["date_to"] = date_to
+        binds.append(bindparam("date_to", type_=DateTime))
+
+    statement = text(
+        f"SELECT s.id AS id, bm25({FTS_TABLE}) AS rank "
+        f"FROM {FTS_TABLE} JOIN signatures AS s ON s.rowid = {FTS_TABLE}.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {'rank' if sort == 'rank' else FTS_TABLE + '.rowid DESC'} "
+        f"LIMIT :limit OFFSET :offset"
+    ).bindparams(*binds).columns(id=UUIDBytes())
+
+    rows = db.execute(statement, params).all()
+    return [(row.id, row.rank) for row in rows[:limit]], len(rows) > limit
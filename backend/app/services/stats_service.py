@@ -0,0 +1,160 @@
+"""
+Statystyki podpisów utrzymywane przyrostowo w tabeli signature_stats.
+
+Liczniki są aktualizowane w tej samej transakcji co dodanie / usunięcie
+podpisu, więc odczyt statystyk nie zależy od rozmiaru tabeli signatures.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import select, update, insert, func, literal
+
+from ..database import SignatureStat, Signature, User
+from . import registry_service
+
+
+def _stat_keys(signature) -> list:
+    """Klucze (wymiar, wartość), do których wlicza się podpis"""
+    return [
+        ("total", ""),
+        ("user", signature.user_id),
+        ("day", signature.created_at.date().isoformat()),
+        ("reason", signature.signer_reason or ""),
+    ]
+
+
+def _apply_deltas(db, deltas: dict):
+    """Dodaje (liczba, bajty) do liczników; brakujące wiersze tworzy"""
+    table = SignatureStat.__table__
+    for (dimension, key), (count_delta, bytes_delta) in deltas.items():
+        result = db.execute(
+            update(table)
+            .where(table.c.dimension == dimension, table.c.key == key)
+            .values(
+                signature_count=table.c.signature_count + count_delta,
+                storage_bytes=table.c.storage_bytes + bytes_delta
+            )
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(
+                dimension=dimension,
+                key=key,
+                signature_count=count_delta,
+                storage_bytes=bytes_delta
+            ))
+
+
+def _deltas(signatures, sign: int) -> dict:
+    deltas = defaultdict(lambda: [0, 0])
+    for signature in signatures:
+        size = signature.file_size or 0
+        for stat_key in _stat_keys(signature):
+            deltas[stat_key][0] += sign
+            deltas[stat_key][1] += sign * size
+    return deltas
+
+
+def record_insert(db, signature: Signature):
+    """Wlicza nowy podpis (wywołać po flush, przed commit)"""
+    _apply_deltas(db, _deltas([signature], +1))
+    registry_service.bump(db)
+
+
+def record_delete(db, signature: Signature):
+    """Odejmuje usuwany podpis (wywołać przed commit)"""
+    _apply_deltas(db, _deltas([signature], -1))
+    registry_service.bump(db)
+
+
+def record_bulk_delete(db, signatures):
+    """Odejmuje wiele usuwanych podpisów naraz (jedna aktualizacja na licznik)"""
+    _apply_deltas(db, _deltas(signatures, -1))
+    registry_service.bump(db)
+
+
+def rebuild(conn):
+    """Przelicza wszystkie liczniki od zera (migracja / naprawa)"""
+    stats = SignatureStat.__table__
+    signatures = Signature.__table__
+    conn.execute(stats.delete())
+
+    groups = [
+        ("total", literal("")),
+        ("user", signatures.c.user_id),
+        ("day", func.date(signatures.c.created_at)),
+        ("reason", func.coalesce(signatures.c.signer_reason, "")),
+    ]
+    for dimension, key_expr in groups:
+        rows = conn.execute(
+            select(
+                key_expr.label("key"),
+                func.count().label("signature_count"),
+                func.coalesce(func.sum(signatures.c.file_size), 0).label("storage_bytes")
+            ).group_by(key_expr)
+        ).all()
+        for row in rows:
+            if row.signature_count:
+                conn.execute(insert(stats).values(
+                    dimension=dimension,
+                    key=row.key,
+                    signature_count=row.signature_count,
+                    storage_bytes=row.storage_bytes
+                ))
+
+
+def get_total(db) -> tuple:
+    """(liczba podpisów, zajęte bajty) - odczyt jednego wiersza"""
+    row = db.get(SignatureStat, ("total", ""))
+    return (row.signature_count, row.storage_bytes) if row else (0, 0)
+
+
+def get_statistics(db, days: int = 30) -> dict:
+    """Statystyki dla dashboardu: suma, per użytkownik, per dzień, per powód"""
+    total_count, total_bytes = get_total(db)
+
+    def rows(dimension, order_by, limit=None):
+        query = (
+            db.query(SignatureStat)
+            .filter(SignatureStat.dimension == dimension, SignatureStat.signature_count > 0)
+            .order_by(order_by)
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    user_rows = rows("user", SignatureStat.signature_count.desc())
+    usernames = dict(
+        db.query(User.id, User.username)
+        .filter(User.id.in_([row.key for row in user_rows]))
+        .all()
+    ) if user_rows else {}
+
+    return {
+        "total_signatures": total_count,
+        "storage_bytes": total_bytes,
+        "per_user": [
+            {
+                "user_id": row.key,
+                "username": usernames.get(row.key),
+                "signature_count": row.signature_count,
+                "storage_bytes": row.storage_bytes
+            }
+            for row in user_rows
+        ],
+        "per_day": [
+            {
+                "day": row.key,
+                "signature_count": row.signature_count,
+                "storage_bytes": row.storage_bytes
+            }
+            for row in rows("day", SignatureStat.key.desc(), limit=days)
+        ],
+        "per_reason": [
+            {
+                "reason": row.key or None,
+                "signature_count": row.signature_count,
+                "storage_bytes": row.storage_bytes
+            }
+            for row in rows("reason", SignatureStat.signature_count.desc())
+        ]
+    }
@@ -0,0 +1,120 @@
+"""Wspólne fixtures: izolowana baza i foldery, klient API, podpisywanie dokumentów."""
+
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+# Konfiguracja musi być ustawiona przed importem aplikacji
+_WORK_DIR = tempfile.mkdtemp(prefix="pdf_signature_tests_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_WORK_DIR}/signatures.db",
+    "SIGNED_PDF_DIR": os.path.join(_WORK_DIR, "signed_pdfs"),
+    "STAGING_DIR": os.path.join(_WORK_DIR, "staging"),
+    "ARCHIVE_DIR": os.path.join(_WORK_DIR, "archive"),
+    "GC_QUARANTINE_DIR": os.path.join(_WORK_DIR, "quarantine"),
+    "GC_INTERVAL_SECONDS": "0",
+    "ARCHIVE_INTERVAL_SECONDS": "0",
+    "PREWARM_ON_STARTUP": "0",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from fastapi.testclient import TestClient
+from PyPDF2 import PdfWriter
+
+from app.main import app
+
+
+def _b64url(number: int) -> str:
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def make_pdf(title: str = "test") -> bytes:
+    writer = PdfWriter()
+    writer.add_blank_page(200, 200)
+    writer.add_metadata({"/Title": title})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return register_user(client, is_admin=True)
+
+
+def register_user(client, is_admin: bool = False) -> dict:
+    """Rejestruje nowego użytkownika i zwraca nagłówki z jego tokenem"""
+    username = f"{'admin' if is_admin else 'user'}_{uuid.uuid4().hex[:8]}"
+    response = client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "haslo",
+        "is_admin": is_admin
+    })
+    assert response.status_code == 200, response.text
+    token = client.post(
+        "/api/auth/token", data={"username": username, "password": "haslo"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def private_key():
+    return rsa.generate_private_key(65537, 2048)
+
+
+@pytest.fixture(scope="session")
+def public_jwk(private_key):
+    numbers = private_key.public_key().public_numbers()
+    return {"kty": "RSA", "n": _b64url(numbers.n), "e": _b64url(numbers.e), "alg": "PS256", "ext": True}
+
+
+@pytest.fixture
+def sign_document(client, admin_headers, private_key, public_jwk):
+    """Przechodzi prepare -> embed; zwraca (id podpisu, odpowiedź prepare)"""
+
+    def sign(
+        pdf: bytes = None, filename: str = "dokument.pdf", name: str = "Jan Kowalski", headers: dict = None, **form
+    ):
+        headers = headers or admin_headers
+        prepared = client.post(
+            "/api/signature/prepare-signature-with-metadata",
+            files={"file": (filename, pdf or make_pdf(uuid.uuid4().hex), "application/pdf")},
+            data={"metadata": "{}", **form},
+            headers=headers
+        )
+        assert prepared.status_code == 200, prepared.text
+        prepared = prepared.json()
+        signature = private_key.sign(
+            base64.b64decode(prepared["file_hash"]),
+            padding.PSS(padding.MGF1(hashes.SHA256()), 32),
+            hashes.SHA256()
+        )
+        embedded = client.post(
+            "/api/signature/embed-signature-to-db",
+            data={
+                "temp_file_path": prepared["temp_file_path"],
+                "signature": base64.b64encode(signature).decode(),
+                "public_key": json.dumps(public_jwk),
+                "metadata": json.dumps({"name": name, "filename": filename, "reason": "test"})
+            },
+            headers=headers
+        )
+        assert embedded.status_code == 200, embedded.text
+        return embedded.json()["signature_id"], prepared
+
+    return sign
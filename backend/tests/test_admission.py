@@ -0,0 +1,56 @@
+"""Admission control: limit na klucz klienta i wyznaczanie klucza dla verify."""
+
+import asyncio
+from contextlib import AsyncExitStack
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import config
+from app.services import admission_service
+from app.services.admission_service import AdmissionController
+
+
+def _request(peer: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 50000), "headers": headers})
+
+
+def test_per_key_cap_does_not_block_other_keys():
+    controller = AdmissionController(
+        name="test",
+        max_concurrency=10,
+        max_queue=10,
+        max_per_user=2,
+        queue_timeout=1.0,
+        initial_service_time=0.1
+    )
+
+    async def scenario():
+        async with AsyncExitStack() as stack:
+            for _ in range(2):
+                await stack.enter_async_context(controller.slot("ip:203.0.113.5"))
+            with pytest.raises(HTTPException) as rejected:
+                await stack.enter_async_context(controller.slot("ip:203.0.113.5"))
+            assert rejected.value.status_code == 429
+            # Inny klient za tym samym proxy ma własny limit
+            await stack.enter_async_context(controller.slot("ip:198.51.100.7"))
+            await stack.enter_async_context(controller.slot("user:jan"))
+
+    asyncio.run(scenario())
+    assert controller.rejected_per_user == 1
+
+
+def test_client_key_uses_forwarded_address_only_from_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(config, "TRUSTED_PROXY_IPS", {"10.0.0.1", "10.0.0.2"})
+
+    # Klient -> proxy 10.0.0.2 -> proxy 10.0.0.1 -> aplikacja
+    request = _request("10.0.0.1", "198.51.100.99, 203.0.113.5, 10.0.0.2")
+    assert admission_service.client_key(request) == "ip:203.0.113.5"
+
+    # Połączenie bezpośrednie - nagłówek podany przez klienta jest ignorowany
+    assert admission_service.client_key(_request("192.0.2.10", "203.0.113.5")) == "ip:192.0.2.10"
+
+    # Zalogowany użytkownik ma własny limit niezależnie od adresu
+    assert admission_service.client_key(request, "jan") == "user:jan"
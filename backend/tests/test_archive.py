@@ -0,0 +1,103 @@
+"""Archiwizacja podpisanych PDF-ów do paczek i pobieranie z archiwum."""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from app import config
+from app.database import SessionLocal, Signature
+from app.services import archive_service
+
+
+def _signature(signature_id):
+    db = SessionLocal()
+    try:
+        return db.get(Signature, signature_id)
+    finally:
+        db.close()
+
+
+def test_archive_round_trip(client, admin_headers, sign_document):
+    signature_id, _ = sign_document()
+    hot_path = _signature(signature_id).signed_pdf_path
+    with open(hot_path, "rb") as f:
+        original = f.read()
+
+    report = archive_service.archive_old(older_than_days=0)
+
+    assert report["archived"] >= 1
+    archived = _signature(signature_id)
+    assert archived.storage_tier == archive_service.ARCHIVE_TIER
+    assert archived.signed_pdf_path is None
+    assert os.path.exists(archive_service.pack_path(archived.archive_pack))
+
+    response = client.get(f"/api/signature/download-signed-pdf/{signature_id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.content == original
+
+    assert archive_service.archive_old(older_than_days=0)["archived"] == 0
+
+
+def test_archive_waits_for_lock_held_by_other_process(sign_document):
+    fcntl = pytest.importorskip("fcntl")
+    signature_id, _ = sign_document()
+    config.ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    reports = []
+
+    with open(os.path.join(config.ARCHIVE_DIR, archive_service.LOCK_FILE), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        worker = threading.Thread(target=lambda: reports.append(archive_service.archive_old(older_than_days=0)))
+        worker.start()
+        worker.join(0.5)
+        assert worker.is_alive()
+        assert _signature(signature_id).storage_tier == archive_service.HOT_TIER
+        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    worker.join(10)
+    assert reports and reports[0]["archived"] >= 1
+    assert _signature(signature_id).storage_tier == archive_service.ARCHIVE_TIER
+
+
+def test_deleted_archived_document_is_erased_and_compacted(client, admin_headers, sign_document):
+    deleted_id, _ = sign_document()
+    kept_id, _ = sign_document()
+    with open(_signature(kept_id).signed_pdf_path, "rb") as f:
+        kept_original = f.read()
+    archive_service.archive_old(older_than_days=0)
+    deleted = _signature(deleted_id)
+    pack, offset, length = deleted.archive_pack, deleted.archive_offset, deleted.archive_length
+
+    response = client.delete(f"/api/admin/signatures/{deleted_id}", headers=admin_headers)
+    assert response.status_code == 200
+
+    # Fragment paczki zerowany w tle
+    def member_bytes():
+        with open(archive_service.pack_path(pack), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    deadline = time.monotonic() + 5
+    while member_bytes() != b"\0" * length and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert member_bytes() == b"\0" * length
+    with open(archive_service.pack_path(pack)[:-len(archive_service.PACK_SUFFIX)] + archive_service.INDEX_SUFFIX) as f:
+        tombstones = [json.loads(line) for line in f if '"deleted"' in line]
+    assert {"id": deleted_id, "deleted": True, "offset": offset, "length": length} in tombstones
+
+    stats = client.get("/api/admin/archive", headers=admin_headers).json()
+    assert stats["dead_bytes"] >= length
+
+    report = client.post(
+        "/api/admin/archive/compact", params={"min_dead_fraction": 0}, headers=admin_headers
+    ).json()
+    assert pack in report["compacted_packs"]
+    assert not os.path.exists(archive_service.pack_path(pack))
+    assert client.get("/api/admin/archive", headers=admin_headers).json()["dead_bytes"] == 0
+
+    # Żywe dokumenty przeniesione do nowej paczki nadal do pobrania
+    assert _signature(kept_id).archive_pack != pack
+    downloaded = client.get(f"/api/signature/download-signed-pdf/{kept_id}", headers=admin_headers)
+    assert downloaded.content == kept_original
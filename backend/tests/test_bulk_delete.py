@@ -0,0 +1,20 @@
+"""Masowe usuwanie podpisów po liście id."""
+
+import uuid
+
+
+def test_bulk_delete_long_id_list(client, admin_headers, sign_document):
+    first_id, _ = sign_document()
+    second_id, _ = sign_document()
+    # Więcej id niż zmiennych w jednym zapytaniu SQLite, wielkie litery i duplikaty
+    unknown_ids = [str(uuid.uuid4()) for _ in range(40000)]
+    ids = [first_id.upper(), first_id, second_id, "nie-uuid"] + unknown_ids
+
+    response = client.post("/api/admin/signatures/bulk-delete", json={"ids": ids}, headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["deleted"] == 2
+    assert set(body["ids"]) == {first_id, second_id}
+    assert body["not_matched"] == len(unknown_ids) + 1
+    assert client.get(f"/api/admin/signatures/{first_id}", headers=admin_headers).status_code == 404
@@ -0,0 +1,69 @@
+"""Sprzątanie dysku: osierocone podpisane PDF-y."""
+
+import os
+import shutil
+import time
+
+from app import config
+from app.database import SessionLocal, Signature
+from app.services import disk_gc
+
+
+def _old_file(path: str, data: bytes = b"%PDF-1.4"):
+    with open(path, "wb") as f:
+        f.write(data)
+    past = time.time() - 10 * config.GC_GRACE_SECONDS
+    os.utime(path, (past, past))
+
+
+def _signed_paths(signature_ids):
+    db = SessionLocal()
+    try:
+        return [db.get(Signature, signature_id).signed_pdf_path for signature_id in signature_ids]
+    finally:
+        db.close()
+
+
+def test_orphans_refused_when_database_does_not_match(tmp_path, monkeypatch):
+    # Katalog pełen plików, których baza nie zna - np. uruchomienie ze złym DATABASE_URL
+    signed_dir = tmp_path / "signed"
+    signed_dir.mkdir()
+    for index in range(3):
+        _old_file(signed_dir / f"podpisany_{index}.pdf")
+    monkeypatch.setattr(config, "SIGNED_PDF_DIR", signed_dir)
+    monkeypatch.setattr(config, "GC_QUARANTINE_DIR", tmp_path / "quarantine")
+
+    report = disk_gc.sweep()
+
+    orphans = report["orphaned_signed_pdfs"]
+    assert orphans["refused"]
+    assert orphans["removed"] == 0
+    assert len(os.listdir(signed_dir)) == 3
+
+    forced = disk_gc.sweep(force=True)["orphaned_signed_pdfs"]
+    assert forced["removed"] == 3
+    assert sorted(os.listdir(tmp_path / "quarantine")) == [f"podpisany_{index}.pdf" for index in range(3)]
+
+
+def test_orphan_moved_to_quarantine_and_known_files_kept(sign_document, tmp_path, monkeypatch):
+    # Pliki z bazy skopiowane do innego katalogu - rozpoznawane po nazwie (inny katalog roboczy)
+    signed_dir = tmp_path / "signed"
+    signed_dir.mkdir()
+    for path in _signed_paths([sign_document()[0] for _ in range(3)]):
+        shutil.copy(path, signed_dir / os.path.basename(path))
+    _old_file(signed_dir / "sierota.pdf")
+    monkeypatch.setattr(config, "SIGNED_PDF_DIR", signed_dir)
+    monkeypatch.setattr(config, "GC_QUARANTINE_DIR", tmp_path / "quarantine")
+    monkeypatch.setattr(config, "GC_ORPHAN_MAX_FRACTION", 0.5)
+
+    # Cykliczne sprzątanie domyślnie tylko raportuje
+    scheduled = disk_gc.sweep(orphans_dry_run=True)["orphaned_signed_pdfs"]
+    assert scheduled["paths"] == [str(signed_dir / "sierota.pdf")]
+    assert (signed_dir / "sierota.pdf").exists()
+
+    report = disk_gc.sweep()["orphaned_signed_pdfs"]
+    assert report["refused"] is None
+    assert report["removed"] == 1
+    assert not (signed_dir / "sierota.pdf").exists()
+    assert (tmp_path / "quarantine" / "sierota.pdf").exists()
+    assert len(os.listdir(signed_dir)) == 3
@@ -0,0 +1,28 @@
+"""Osadzanie podpisu: pliki podpisanych PDF-ów."""
+
+import os
+from datetime import datetime
+
+from app.database import SessionLocal, Signature
+from app.routes import signature_routes
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2024, 5, 1, 12, 0, 0)
+
+
+def test_same_document_signed_twice_in_one_second(sign_document, monkeypatch):
+    monkeypatch.setattr(signature_routes, "datetime", _FrozenDatetime)
+    first_id, _ = sign_document(filename="umowa.pdf")
+    second_id, _ = sign_document(filename="umowa.pdf")
+
+    db = SessionLocal()
+    try:
+        paths = [db.get(Signature, signature_id).signed_pdf_path for signature_id in (first_id, second_id)]
+    finally:
+        db.close()
+    assert paths[0] != paths[1]
+    assert first_id in os.path.basename(paths[0])
+    assert all(os.path.exists(path) for path in paths)
@@ -0,0 +1,44 @@
+"""Uwierzytelnienie strumienia zdarzeń (EventSource nie wysyła nagłówków)."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import get_events_user
+from app.database import SessionLocal
+
+from .conftest import register_user
+
+
+def _events_user(**tokens):
+    db = SessionLocal()
+    try:
+        return asyncio.run(get_events_user(token=tokens.get("token"), header_token=tokens.get("header_token"), db=db))
+    finally:
+        db.close()
+
+
+def test_events_token_authenticates_only_event_stream(client, admin_headers):
+    response = client.post("/api/admin/events/token", headers=admin_headers)
+    assert response.status_code == 200
+    events_token = response.json()["token"]
+
+    assert _events_user(token=events_token).role == "admin"
+
+    # Token zdarzeń nie zastępuje tokenu logowania w innych endpointach
+    other = client.get("/api/admin/statistics", headers={"Authorization": f"Bearer {events_token}"})
+    assert other.status_code == 401
+
+    # ...a zwykły token nie jest przyjmowany w ?token=
+    login_token = admin_headers["Authorization"].split(" ", 1)[1]
+    with pytest.raises(HTTPException) as rejected:
+        _events_user(token=login_token)
+    assert rejected.value.status_code == 401
+    assert _events_user(header_token=login_token).role == "admin"
+
+
+def test_events_rejects_missing_token_and_non_admins(client):
+    assert client.get("/api/admin/events").status_code == 401
+    assert client.get("/api/admin/events", params={"token": "zly"}).status_code == 401
+    assert client.post("/api/admin/events/token", headers=register_user(client)).status_code == 403
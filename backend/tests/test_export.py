@@ -0,0 +1,42 @@
+"""Eksport rejestru: stronicowanie, wznawianie od kursora, zapisy w trakcie eksportu."""
+
+import json
+
+from app import config
+from app.services import export_service
+
+
+def _export(client, headers, **params):
+    response = client.get("/api/admin/export", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_resumes_after_cursor(client, admin_headers, sign_document, monkeypatch):
+    for _ in range(3):
+        sign_document()
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 2)
+
+    rows = _export(client, admin_headers)
+    assert len(rows) >= 3
+    assert len({row["id"] for row in rows}) == len(rows)
+
+    resumed = _export(client, admin_headers, after=rows[0]["cursor"])
+    assert [row["id"] for row in resumed] == [row["id"] for row in rows[1:]]
+
+    assert _export(client, admin_headers, after=rows[-1]["cursor"]) == []
+
+
+def test_writes_succeed_during_slow_export(client, admin_headers, sign_document, monkeypatch):
+    sign_document()
+    sign_document()
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 1)
+    monkeypatch.setattr(config, "EXPORT_CHUNK_BYTES", 1)
+
+    # Klient odebrał pierwszy kawałek i czeka - baza nie może być zablokowana
+    chunks = export_service.iter_export()
+    first = next(chunks)
+    signature_id, _ = sign_document()
+    lines = (first + b"".join(chunks)).decode("utf-8").splitlines()
+
+    assert signature_id in {json.loads(line)["id"] for line in lines}
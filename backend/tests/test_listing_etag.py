@@ -0,0 +1,76 @@
+"""ETag list podpisów: 304 dla aktualnej wersji, nowa wersja po zmianie rejestru."""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import migrations
+from app.services import listing_service, registry_service
+from app.services.cache_service import LRUCache
+
+
+def test_etag_not_modified_until_registry_changes(client, admin_headers, sign_document):
+    sign_document()
+    first = client.get("/api/admin/signatures", headers=admin_headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/admin/signatures", headers={**admin_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    signature_id, _ = sign_document()
+    changed = client.get("/api/admin/signatures", headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert signature_id in {record["id"] for record in changed.json()["records"]}
+
+    deleted = client.delete(f"/api/admin/signatures/{signature_id}", headers=admin_headers)
+    assert deleted.status_code == 200
+    after_delete = client.get(
+        "/api/admin/signatures", headers={**admin_headers, "If-None-Match": changed.headers["ETag"]}
+    )
+    assert after_delete.status_code == 200
+    assert signature_id not in {record["id"] for record in after_delete.json()["records"]}
+
+
+def test_new_database_has_its_own_epoch(tmp_path):
+    etags = []
+    for name in ("a.db", "b.db"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}")
+        migrations.upgrade(engine)
+        with Session(engine) as db:
+            etag = registry_service.get_etag(db)
+            assert etag == registry_service.get_etag(db)
+            etags.append(etag)
+    # Puste bazy utworzone od nowa nie mogą dzielić ETagu
+    assert etags[0] != etags[1]
+
+
+def test_page_cache_keeps_only_current_version_and_known_params(client, admin_headers, sign_document):
+    sign_document()
+    listing_service.page_cache.clear()
+
+    for extra in ("1", "2", "3"):
+        response = client.get("/api/admin/signatures", params={"x": extra}, headers=admin_headers)
+        assert response.status_code == 200
+    # Nieobsługiwane parametry nie tworzą nowych wpisów
+    assert len(listing_service.page_cache) == 1
+    client.get("/api/admin/signatures", params={"fields": "id"}, headers=admin_headers)
+    assert len(listing_service.page_cache) == 2
+
+    # Nowa wersja rejestru - strony poprzedniej wersji są zwalniane
+    sign_document()
+    client.get("/api/admin/signatures", headers=admin_headers)
+    assert len(listing_service.page_cache) == 1
+
+
+def test_lru_cache_bounded_by_bytes():
+    cache = LRUCache(max_size=100, max_bytes=10)
+    for key in ("a", "b", "c"):
+        cache.set(key, b"1234")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+
+    # Wartość większa niż cały budżet nie wypycha reszty
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("c") == b"1234"
@@ -0,0 +1,102 @@
+"""Migracja bazy w schemacie sprzed zmian (tekstowe id, JWK w każdym wierszu)."""
+
+import base64
+import json
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import migrations
+from app.database import PublicKey, Signature
+from app.services import registry_service, search_service, stats_service
+from app.services.crypto_service import jwk_thumbprint
+
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id VARCHAR NOT NULL PRIMARY KEY,
+    username VARCHAR NOT NULL,
+    email VARCHAR NOT NULL UNIQUE,
+    hashed_password VARCHAR NOT NULL,
+    role VARCHAR,
+    created_at DATETIME
+);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE TABLE signatures (
+    id VARCHAR NOT NULL PRIMARY KEY,
+    user_id VARCHAR NOT NULL REFERENCES users (id),
+    file_hash VARCHAR NOT NULL,
+    signature_data TEXT NOT NULL,
+    public_key_jwk TEXT NOT NULL,
+    signed_pdf_path VARCHAR,
+    original_filename VARCHAR,
+    signer_name VARCHAR,
+    signer_location VARCHAR,
+    signer_reason VARCHAR,
+    signer_contact VARCHAR,
+    created_at DATETIME NOT NULL
+);
+"""
+
+USER_ID = "0b7c3f5e-8d2a-4c1e-9f6b-2a4d6e8f0a1c"
+SIGNATURE_IDS = ["5f1e2d3c-4b5a-4697-8877-66554433221a", "5f1e2d3c-4b5a-4697-8877-66554433221b"]
+JWK = {"kty": "RSA", "n": "sXchDaQebHnPiGvyDOAT4saGEUetSyo9MKLOoWFsueri23bOdgWp4Dy1Wl", "e": "AQAB"}
+
+
+def _baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute(
+        "INSERT INTO users VALUES (?, 'stary', 'stary@example.com', 'x', 'user', ?)",
+        (USER_ID, "2024-01-01 10:00:00.000000")
+    )
+    for index, signature_id in enumerate(SIGNATURE_IDS):
+        conn.execute(
+            "INSERT INTO signatures VALUES (?, ?, ?, ?, ?, NULL, ?, ?, 'Kraków', 'umowa', NULL, ?)",
+            (
+                signature_id,
+                USER_ID,
+                base64.b64encode(bytes([index]) * 32).decode(),
+                base64.b64encode(b"podpis" * 40).decode(),
+                json.dumps(JWK),
+                f"umowa_{index}.pdf",
+                f"Zażółć Gęślą {index}",
+                f"2024-02-0{index + 1} 12:00:00.000000",
+            )
+        )
+    conn.commit()
+    conn.close()
+
+
+def test_upgrade_baseline_database(tmp_path):
+    path = tmp_path / "baseline.db"
+    _baseline_db(path)
+    engine = create_engine(f"sqlite:///{path}")
+
+    migrations.upgrade(engine)
+
+    with Session(engine) as db:
+        signatures = db.query(Signature).order_by(Signature.created_at).all()
+        assert [signature.id for signature in signatures] == SIGNATURE_IDS
+        assert signatures[1].file_hash == base64.b64encode(bytes([1]) * 32).decode()
+        assert signatures[0].user_id == USER_ID
+        assert signatures[0].created_at == datetime(2024, 2, 1, 12)
+        assert signatures[0].storage_tier == "hot"
+
+        # Klucz publiczny zapisany raz, wiersze wskazują na niego thumbprintem
+        assert db.query(PublicKey).count() == 1
+        assert {signature.public_key_thumbprint for signature in signatures} == {jwk_thumbprint(JWK)}
+        assert json.loads(signatures[0].public_key_jwk) == JWK
+
+        assert stats_service.get_total(db) == (2, 0)
+        found, _ = search_service.search_signatures(db, "gesla")
+        assert {signature_id for signature_id, _ in found} == set(SIGNATURE_IDS)
+        etag = registry_service.get_etag(db)
+
+    # Ponowne uruchomienie niczego nie przebudowuje
+    migrations.upgrade(engine)
+    with Session(engine) as db:
+        assert db.query(Signature).count() == 2
+        assert stats_service.get_total(db) == (2, 0)
+        assert registry_service.get_etag(db) == etag
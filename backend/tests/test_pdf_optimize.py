@@ -0,0 +1,105 @@
+"""Optymalizacja PDF przed podpisaniem: usuwanie nieużywanych zasobów."""
+
+import io
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+)
+
+from app.services.pdf_service import PdfService
+
+
+def _stream(writer, data: bytes, **entries):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    stream.update({NameObject(key): value for key, value in entries.items()})
+    return writer._add_object(stream)
+
+
+def _image(writer, size: int):
+    return _stream(
+        writer, b"\x00" * size * size,
+        **{
+            "/Type": NameObject("/XObject"),
+            "/Subtype": NameObject("/Image"),
+            "/Width": NumberObject(size),
+            "/Height": NumberObject(size),
+            "/ColorSpace": NameObject("/DeviceGray"),
+            "/BitsPerComponent": NumberObject(8),
+        }
+    )
+
+
+def _font(writer, base_font: str):
+    return writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject(base_font),
+    }))
+
+
+def _pdf_with_inherited_resources() -> bytes:
+    """
+    Strona wywołuje formularz Fm1 bez własnych /Resources - jego treść
+    używa fontu F1 i obrazu Im1 ze słownika strony. Wygląd adnotacji
+    (także bez /Resources) używa fontu F2. Unused nie jest używany nigdzie.
+    """
+    writer = PdfWriter()
+    writer.add_blank_page(300, 300)
+    page = writer.pages[0]
+    form = _stream(
+        writer, b"BT /F1 12 Tf 10 10 Td (formularz) Tj ET q 50 0 0 50 0 0 cm /Im1 Do Q",
+        **{
+            "/Type": NameObject("/XObject"),
+            "/Subtype": NameObject("/Form"),
+            "/BBox": ArrayObject([NumberObject(0), NumberObject(0), NumberObject(300), NumberObject(300)]),
+        }
+    )
+    appearance = _stream(
+        writer, b"BT /F2 8 Tf 0 0 Td (adnotacja) Tj ET",
+        **{
+            "/Type": NameObject("/XObject"),
+            "/Subtype": NameObject("/Form"),
+            "/BBox": ArrayObject([NumberObject(0), NumberObject(0), NumberObject(100), NumberObject(20)]),
+        }
+    )
+    annotation = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"),
+        NameObject("/Subtype"): NameObject("/FreeText"),
+        NameObject("/Rect"): ArrayObject([NumberObject(0), NumberObject(0), NumberObject(100), NumberObject(20)]),
+        NameObject("/AP"): DictionaryObject({NameObject("/N"): appearance}),
+    }))
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({
+            NameObject("/Fm1"): form,
+            NameObject("/Im1"): _image(writer, 16),
+            NameObject("/Unused"): _image(writer, 200),
+        }),
+        NameObject("/Font"): DictionaryObject({
+            NameObject("/F1"): _font(writer, "/Helvetica"),
+            NameObject("/F2"): _font(writer, "/Courier"),
+            NameObject("/F3"): _font(writer, "/Times-Roman"),
+        }),
+    })
+    page[NameObject("/Annots")] = ArrayObject([annotation])
+    page[NameObject("/Contents")] = _stream(writer, b"q /Fm1 Do Q")
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_prune_keeps_resources_used_by_inheriting_forms():
+    original = _pdf_with_inherited_resources()
+
+    optimized, report = PdfService.optimize_pdf(original)
+
+    assert report["applied"]
+    assert report["pruned_resources"] == 2
+    resources = PdfReader(io.BytesIO(optimized)).pages[0]["/Resources"]
+    assert set(resources["/XObject"].keys()) == {"/Fm1", "/Im1"}
+    assert set(resources["/Font"].keys()) == {"/F1", "/F2"}
@@ -0,0 +1,42 @@
+"""Zapis klucza publicznego przy równoległych embedach."""
+
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import migrations
+from app.database import PublicKey, get_or_create_public_key
+from app.services.crypto_service import jwk_thumbprint
+
+JWK = json.dumps({"kty": "RSA", "n": "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4", "e": "AQAB"})
+
+
+def test_concurrent_insert_reuses_existing_row(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    migrations.upgrade(engine)
+    thumbprint = jwk_thumbprint(json.loads(JWK))
+
+    with Session(engine) as other:
+        other.add(PublicKey(thumbprint=thumbprint, jwk=JWK))
+        other.commit()
+
+    with Session(engine) as db:
+        # Pierwszy odczyt nie widzi klucza - jak przy wyścigu z innym żądaniem
+        original_get = Session.get
+        calls = []
+
+        def racing_get(self, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                return None
+            return original_get(self, *args, **kwargs)
+
+        monkeypatch.setattr(Session, "get", racing_get)
+        public_key = get_or_create_public_key(db, JWK)
+        monkeypatch.undo()
+
+        assert public_key.thumbprint == thumbprint
+        assert db.in_transaction()
+        db.commit()
+        assert db.query(PublicKey).count() == 1
@@ -0,0 +1,33 @@
+"""Wyszukiwanie pełnotekstowe dokumentów."""
+
+from sqlalchemy import event
+
+from app.database import engine
+
+from .conftest import register_user
+
+
+def test_search_page_uses_constant_number_of_queries(client, admin_headers, sign_document):
+    # Wyniki od różnych użytkowników - każdy wymagałby osobnego doładowania
+    for _ in range(5):
+        sign_document(name="Wyszukiwany Podpisujący", headers=register_user(client))
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get(
+            "/api/admin/search", params={"q": "wyszukiwany", "limit": 100}, headers=admin_headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    documents = response.json()["documents"]
+    assert len(documents) >= 5
+    assert all(document["username"] for document in documents)
+    # Uwierzytelnienie, FTS, rekordy, użytkownicy - bez zapytania na każdy wynik
+    assert len(statements) < len(documents)
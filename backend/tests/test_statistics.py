@@ -0,0 +1,16 @@
+"""Statystyki podpisów dla administratora."""
+
+import pytest
+
+
+def test_statistics_days_limit(client, admin_headers, sign_document):
+    sign_document()
+    response = client.get("/api/admin/statistics", params={"days": 1}, headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.json()["per_day"]) <= 1
+
+
+@pytest.mark.parametrize("days", [0, -1, 367])
+def test_statistics_rejects_unbounded_days(client, admin_headers, days):
+    response = client.get("/api/admin/statistics", params={"days": days}, headers=admin_headers)
+    assert response.status_code == 422